@@ -0,0 +1,118 @@
+"""
+种子文件解析性能对比：utils.bencode.scan_torrent vs bencodepy
+
+生成一个多文件的测试种子，分别用两种方式提取 info_hash、名称、comment 和总大小，
+比较耗时和内存峰值。
+
+用法（在 backend 目录下运行，需要额外安装 bencodepy）：
+    python -m benchmarks.bencode_bench
+    python -m benchmarks.bencode_bench --files 20000 --rounds 5
+"""
+
+import argparse
+import hashlib
+import os
+import time
+import tracemalloc
+
+from utils.bencode import scan_torrent
+
+
+def _encode(value) -> bytes:
+    """最小的 bencode 编码器，用于生成测试数据（不依赖 bencodepy）"""
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list):
+        return b"l" + b"".join(_encode(v) for v in value) + b"e"
+    if isinstance(value, dict):
+        items = sorted((k.encode() if isinstance(k, str) else k, v) for k, v in value.items())
+        return b"d" + b"".join(_encode(k) + _encode(v) for k, v in items) + b"e"
+    raise TypeError(type(value))
+
+
+def make_torrent(file_count: int, piece_count: int) -> bytes:
+    """生成测试种子：file_count 个文件，piece_count 个分块哈希"""
+    files = [
+        {"length": 1024 * 1024 + i, "path": ["Season 01", f"Episode {i:05d}.mkv"]}
+        for i in range(file_count)
+    ]
+    return _encode({
+        "announce": "https://tracker.example.com/announce?passkey=0123456789abcdef",
+        "comment": "123456",
+        "created by": "bencode_bench",
+        "info": {
+            "name": "Benchmark Torrent",
+            "piece length": 4 * 1024 * 1024,
+            "pieces": os.urandom(20 * piece_count),
+            "files": files,
+        },
+    })
+
+
+def with_scanner(content: bytes):
+    meta = scan_torrent(content)
+    return meta.info_hash, meta.name, meta.comment, meta.total_size
+
+
+def with_bencodepy(content: bytes):
+    import bencodepy
+    data = bencodepy.decode(content)
+    info = data[b"info"]
+    info_hash = hashlib.sha1(bencodepy.encode(info)).hexdigest()
+    if b"length" in info:
+        total_size = info[b"length"]
+    else:
+        total_size = sum(f.get(b"length", 0) for f in info[b"files"])
+    return info_hash, info[b"name"].decode(), data[b"comment"].decode(), total_size
+
+
+def measure(func, content: bytes, rounds: int):
+    """返回 (平均耗时秒, 内存峰值字节, 结果)"""
+    result = func(content)  # 预热
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(content)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    tracemalloc.start()
+    func(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="种子文件解析性能对比")
+    parser.add_argument("--files", type=int, default=5000, help="测试种子的文件数")
+    parser.add_argument("--pieces", type=int, default=20000, help="测试种子的分块数")
+    parser.add_argument("--rounds", type=int, default=10, help="每种方式的运行次数")
+    args = parser.parse_args()
+
+    content = make_torrent(args.files, args.pieces)
+    print(f"测试种子: {len(content) / 1024:.1f} KB, {args.files} 个文件, {args.pieces} 个分块")
+
+    candidates = [("scan_torrent", with_scanner)]
+    try:
+        import bencodepy  # noqa: F401
+        candidates.append(("bencodepy", with_bencodepy))
+    except ImportError:
+        print("未安装 bencodepy，只测试 scan_torrent（pip install bencodepy）")
+
+    results = {}
+    for name, func in candidates:
+        elapsed, peak, result = measure(func, content, args.rounds)
+        results[name] = result
+        print(f"{name:>14}: {elapsed * 1000:8.2f} ms/次, 内存峰值 {peak / 1024:8.1f} KB")
+
+    if len(results) == 2 and len(set(results.values())) != 1:
+        print("警告: 两种方式的结果不一致")
+        for name, result in results.items():
+            print(f"  {name}: {result}")
+
+
+if __name__ == "__main__":
+    main()
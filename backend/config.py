@@ -19,6 +19,46 @@ class Settings(BaseSettings):
     # M-Team 配置
     MTEAM_BASE_URL: str = "https://api.m-team.cc"
     
+    # M-Team HTTP 连接池配置
+    MTEAM_HTTP2: bool = True  # 是否启用 HTTP/2（需要安装 h2）
+    MTEAM_HTTP_MAX_CONNECTIONS: int = 20  # 最大连接数
+    MTEAM_HTTP_MAX_KEEPALIVE: int = 10  # 最大保持活动的连接数
+    MTEAM_HTTP_KEEPALIVE_EXPIRY: float = 120.0  # 空闲连接保持时间（秒）
+    
+    # M-Team 请求限流（按 API Key 分别计算）
+    MTEAM_RATE_LIMIT_PER_SECOND: float = 2.0  # 持续速率（每秒请求数）
+    MTEAM_RATE_LIMIT_BURST: int = 5  # 允许的突发请求数
+    MTEAM_RATE_LIMIT_MAX_BACKOFF: float = 60.0  # 被限流时的最长暂停时间（秒）
+    
+    # 熔断器（按 M-Team 账号和下载器分别计算）
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # 连续失败多少次后熔断
+    CIRCUIT_BREAKER_RECOVERY_TIMEOUT: float = 30.0  # 熔断后的探测间隔（秒）
+    
+    # 下载器状态（种子列表、速度、剩余空间）统一轮询
+    DOWNLOADER_STATE_REFRESH_INTERVAL: int = 30  # 后台刷新间隔（秒）
+    DOWNLOADER_STATE_MAX_AGE: float = 30.0  # 读取时可接受的快照最大年龄（秒），超过则立即刷新
+    
+    # 自动下载流水线（搜索 -> 筛选 -> 获取种子文件 -> 推送）：各阶段的并发数和阶段间队列容量
+    # （同一账号访问 M-Team 的请求始终串行）
+    AUTO_DOWNLOAD_DISCOVERY_CONCURRENCY: int = 4
+    AUTO_DOWNLOAD_FILTER_CONCURRENCY: int = 4
+    AUTO_DOWNLOAD_FETCH_CONCURRENCY: int = 4
+    AUTO_DOWNLOAD_PUSH_CONCURRENCY: int = 4
+    AUTO_DOWNLOAD_QUEUE_SIZE: int = 50
+    # 每个下载器同时进行的请求数
+    DOWNLOADER_MAX_CONCURRENT_REQUESTS: int = 2
+    
+    # 促销到期定时器：在促销到期前多少秒删除未完成的种子
+    EXPIRY_TIMER_MARGIN: float = 30.0
+    # 非免费种子推送后等待多少秒再删除（下载器异步添加种子，刚推送时可能还查不到）
+    EXPIRY_PUSH_GRACE: float = 60.0
+    
+    # 种子元数据（分类、来源等）缓存时间（秒），过期后先返回旧数据并在后台刷新
+    MTEAM_METADATA_TTL: int = 86400
+    
+    # 种子文件保留天数：对应下载历史已结束（删除/失败）超过该天数后清理
+    TORRENT_STORE_RETENTION_DAYS: int = 7
+    
     # 定时任务间隔（秒）
     REFRESH_INTERVAL: int = 300
     
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
@@ -54,6 +54,26 @@ def init_db():
     """初始化数据库"""
     Base.metadata.create_all(bind=engine)
     
+    # create_all 不会为已存在的表补充新增的列，可为空的新列在这里补上，
+    # 有默认值的列（如 updated_at）把已有的行填为默认值
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    default = column.default
+                    if default is not None and (default.is_callable or default.is_scalar):
+                        value = default.arg(None) if default.is_callable else default.arg
+                        conn.execute(table.update().values({column.name: value}))
+    
+    # create_all 不会为已存在的表补建索引，新增的索引在这里单独创建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
     # 创建连接以触发 pragma 设置
     with engine.connect() as conn:
         # 分析表以优化查询计划
@@ -12,6 +12,8 @@ from database import init_db
 from routers import accounts, downloaders, torrents, rules, history
 from routers.auth import router as auth_router
 from services.scheduler import start_scheduler, stop_scheduler
+from services.scraper import close_http_client
+from services.qbittorrent import close_downloader_http_client
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -61,8 +63,10 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
-    """关闭时停止定时任务"""
+    """关闭时停止定时任务并释放连接池"""
     stop_scheduler()
+    await close_http_client()
+    await close_downloader_http_client()
 
 @app.get("/health")
 async def health():
@@ -97,6 +97,56 @@ class SystemSettings(Base):
     created_at = Column(DateTime, default=beijing_now)
     updated_at = Column(DateTime, default=beijing_now, onupdate=beijing_now)
 
+class MetadataCache(Base):
+    """种子元数据缓存（分类、来源、介质等，很少变化）"""
+    __tablename__ = "metadata_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    metadata_type = Column(String(50), unique=True, index=True)  # categories, sources 等
+    version = Column(Integer, default=1)  # 缓存格式版本，不一致时视为未命中
+    data = Column(Text)  # 元数据（JSON 字符串）
+    fetched_at = Column(DateTime, default=beijing_now)  # 从 M-Team 获取的时间
+
+class TorrentFile(Base):
+    """种子文件索引（种子文件按 info_hash 存储，同一账号同一种子只保存一份）"""
+    __tablename__ = "torrent_files"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True, index=True)  # 手动上传可能没有账号
+    torrent_id = Column(String(50), nullable=True)  # M-Team 种子ID
+    info_hash = Column(String(64), index=True)
+    size = Column(Integer, default=0)  # 文件大小（字节）
+    created_at = Column(DateTime, default=beijing_now)
+    
+    __table_args__ = (
+        Index('idx_torrent_file_account_torrent', 'account_id', 'torrent_id', unique=True),
+    )
+
+class CrawlCursor(Base):
+    """规则搜索的增量抓取游标（记录已处理过的种子位置）"""
+    __tablename__ = "crawl_cursors"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), index=True)
+    cursor_key = Column(String(500), unique=True, index=True)  # 账号 + 模式 + 促销 + 分类组合
+    last_created_date = Column(String(30), nullable=True)  # 已处理的最新种子发布时间
+    last_torrent_id = Column(String(50), nullable=True)  # 已处理的最新种子ID
+    # 未处理完的空档（翻页达到上限或有种子未处理完时）：gap_floor 以下全部已处理，
+    # 从 resume_page 页（resume 位置所在页）继续向后翻页补齐
+    gap_floor_created_date = Column(String(30), nullable=True)
+    gap_floor_torrent_id = Column(String(50), nullable=True)
+    resume_created_date = Column(String(30), nullable=True)
+    resume_torrent_id = Column(String(50), nullable=True)
+    resume_page = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=beijing_now, onupdate=beijing_now)
+
+# 下载中（未完成）的下载历史状态，过期删种只检查这些记录
+IN_FLIGHT_STATUSES = ("downloading", "pending", "pushing", "queued", "paused")
+
+# 免费促销类型，其他促销类型（50%、无优惠等）下载中的种子会被删除
+FREE_DISCOUNT_TYPES = ("FREE", "_2X_FREE")
+
+
 class DownloadHistory(Base):
     """下载历史"""
     __tablename__ = "download_history"
@@ -116,6 +166,7 @@ class DownloadHistory(Base):
     discount_end_time = Column(DateTime, nullable=True, index=True)  # 添加索引，用于过期检查
     
     created_at = Column(DateTime, default=beijing_now, index=True)  # 添加索引，用于排序
+    updated_at = Column(DateTime, default=beijing_now, onupdate=beijing_now)  # 状态变化时间，种子文件保留期从这里算起
     
     account = relationship("Account", back_populates="downloads")
     
@@ -124,5 +175,10 @@ class DownloadHistory(Base):
         Index('idx_account_created', 'account_id', 'created_at'),  # 按账号和时间查询
         Index('idx_status_created', 'status', 'created_at'),       # 按状态和时间查询
         Index('idx_downloader_status', 'downloader_id', 'status'), # 同步状态时使用
+        # 过期删种：只索引下载中的记录（部分索引），历史记录再多也只扫描下载中的种子
+        Index(
+            'idx_inflight_discount', 'status', 'discount_end_time', 'discount_type',
+            sqlite_where=status.in_(IN_FLIGHT_STATUSES)
+        ),
     )
     downloader = relationship("Downloader")
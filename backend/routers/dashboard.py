@@ -8,7 +8,7 @@ import asyncio
 
 from database import get_db
 from models import Account, DownloadHistory, FilterRule, Downloader, beijing_now
-from services.downloader import get_downloading_count, get_incomplete_torrents, get_seeding_count, get_server_stats
+from services.downloader_state import get_downloader_state
 from utils.cache import cached, cache_key_with_params
 
 router = APIRouter(prefix="/dashboard", tags=["仪表盘"])
@@ -40,6 +40,7 @@ class DownloaderStats(BaseModel):
     # 新增磁盘空间信息
     free_space_gb: float = 0  # 剩余磁盘空间（GB）
     free_space_bytes: int = 0  # 剩余磁盘空间（字节）
+    updated_at: Optional[datetime] = None  # 数据获取时间
 
 class SystemStats(BaseModel):
     """系统统计信息"""
@@ -264,40 +265,25 @@ async def get_downloader_stats(db: Session = Depends(get_db)):
             return basic_stats
         
         try:
-            # 使用 5 秒超时时间
-            downloading_count, seeding_count, incomplete_torrents, server_stats = await asyncio.wait_for(
-                asyncio.gather(
-                    get_downloading_count(downloader),
-                    get_seeding_count(downloader),
-                    get_incomplete_torrents(downloader),
-                    get_server_stats(downloader),
-                    return_exceptions=True
-                ),
-                timeout=5.0
-            )
+            # 读取下载器共享状态（后台定时刷新），使用 5 秒超时时间
+            state = await asyncio.wait_for(get_downloader_state(downloader), timeout=5.0)
             
-            # 检查是否有异常
-            if isinstance(downloading_count, Exception):
-                downloading_count = 0
-            if isinstance(seeding_count, Exception):
-                seeding_count = 0
-            if isinstance(incomplete_torrents, Exception):
-                incomplete_torrents = []
-            if isinstance(server_stats, Exception):
-                server_stats = {}
+            if state is None:
+                basic_stats.connection_status = "错误"
+                return basic_stats
+            
+            snapshot = state.summary(incomplete_limit=5)  # 只返回前5个
             
             # 更新统计信息
-            basic_stats.downloading_count = downloading_count
-            basic_stats.seeding_count = seeding_count
-            basic_stats.incomplete_torrents = incomplete_torrents[:5]  # 只返回前5个
+            basic_stats.downloading_count = snapshot["downloading_count"]
+            basic_stats.seeding_count = snapshot["seeding_count"]
+            basic_stats.incomplete_torrents = snapshot["incomplete_torrents"]
             basic_stats.connection_status = "在线"
-            
-            # 服务器统计信息
-            if server_stats:
-                basic_stats.download_speed = server_stats.get('dl_info_speed', 0)
-                basic_stats.upload_speed = server_stats.get('up_info_speed', 0)
-                basic_stats.free_space_bytes = server_stats.get('free_space_on_disk', 0)
-                basic_stats.free_space_gb = basic_stats.free_space_bytes / (1024**3)
+            basic_stats.download_speed = snapshot["download_speed"]
+            basic_stats.upload_speed = snapshot["upload_speed"]
+            basic_stats.free_space_bytes = snapshot["free_space_bytes"]
+            basic_stats.free_space_gb = snapshot["free_space_gb"]
+            basic_stats.updated_at = state.fetched_at
             
             return basic_stats
             
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 from database import get_db
 from models import Downloader
@@ -10,10 +10,9 @@ from services.downloader import (
     get_tags, 
     get_disk_space_info, 
     get_server_stats,
-    get_downloading_count,
-    get_seeding_count,
-    get_incomplete_torrents
+    release_downloader
 )
+from services.downloader_state import get_downloader_state
 import asyncio
 
 router = APIRouter(prefix="/downloaders", tags=["下载器管理"])
@@ -73,6 +72,7 @@ async def delete_downloader(downloader_id: int, db: Session = Depends(get_db)):
     
     db.delete(downloader)
     db.commit()
+    release_downloader(downloader_id)
     return {"success": True}
 
 
@@ -141,53 +141,14 @@ async def get_all_downloaders_stats(db: Session = Depends(get_db)):
             return basic_info
         
         try:
-            # 增加超时时间到3秒，确保有足够时间获取磁盘空间信息
-            downloading_count, seeding_count, incomplete_torrents, server_stats = await asyncio.wait_for(
-                asyncio.gather(
-                    get_downloading_count(downloader),
-                    get_seeding_count(downloader),
-                    get_incomplete_torrents(downloader),
-                    get_server_stats(downloader),
-                    return_exceptions=True
-                ),
-                timeout=3.0  # 增加到3秒
-            )
+            # 读取下载器共享状态（后台定时刷新）
+            state = await asyncio.wait_for(get_downloader_state(downloader), timeout=3.0)
             
-            # 处理异常结果
-            has_error = False
-            if isinstance(downloading_count, Exception):
-                downloading_count = 0
-                has_error = True
-            if isinstance(seeding_count, Exception):
-                seeding_count = 0
-                has_error = True
-            if isinstance(incomplete_torrents, Exception):
-                incomplete_torrents = []
-                has_error = True
-            if isinstance(server_stats, Exception):
-                server_stats = None
-                has_error = True
-            
-            # 更新基础信息
-            basic_info.update({
-                "downloading_count": downloading_count,
-                "seeding_count": seeding_count,
-                "incomplete_torrents": incomplete_torrents,
-            })
-            
-            # 从服务器统计信息中提取速度和磁盘空间数据
-            if server_stats and not isinstance(server_stats, Exception):
-                basic_info.update({
-                    "download_speed": server_stats.get("dl_info_speed", 0),
-                    "upload_speed": server_stats.get("up_info_speed", 0),
-                    "connection_status": server_stats.get("connection_status", "connected"),
-                    "free_space_gb": server_stats.get("free_space_gb", 0),
-                    "free_space_bytes": server_stats.get("free_space_bytes", 0)
-                })
-            elif has_error:
+            if state is None:
                 basic_info["connection_status"] = "error"
             else:
-                basic_info["connection_status"] = "connected"
+                basic_info.update(state.summary())
+                basic_info["updated_at"] = state.fetched_at.isoformat()
                 
         except asyncio.TimeoutError:
             print(f"[DownloaderStats] 获取下载器 {downloader.name} 数据超时（3秒）")
@@ -8,11 +8,17 @@ import time
 
 from database import get_db
 from models import DownloadHistory, Account, Downloader, FilterRule, beijing_now
-from services.scheduler import check_expired_torrents
-from services.downloader import get_torrent_info_with_tags, add_torrent, get_tags, create_tags
-from config import TORRENT_DIR
+from services.scheduler import check_expired_torrents, forget_seen_torrents
+from services.downloader import add_torrent, get_tags
+from services.downloader_state import get_downloader_state
+from services.expiry_timer import schedule_expiry
+from services.torrent_store import save_torrent
+from utils.bencode import scan_torrent
 from utils.cache import cached, cache_key_with_params
 
+# 手动同步/导入时要求下载器状态在该秒数内获取（导入和同步两步共用一次获取）
+MANUAL_SYNC_MAX_AGE = 5.0
+
 router = APIRouter(prefix="/history", tags=["下载历史"])
 
 class HistoryResponse(BaseModel):
@@ -165,7 +171,10 @@ async def check_expired_status(db: Session = Depends(get_db)):
             downloader = db.query(Downloader).filter(Downloader.id == record.downloader_id).first()
             if downloader:
                 try:
-                    torrent_info = await get_torrent_info_with_tags(downloader, record.info_hash)
+                    downloader_state = await get_downloader_state(downloader)
+                    if downloader_state is None:
+                        raise RuntimeError(f"获取下载器 {downloader.name} 状态失败")
+                    torrent_info = downloader_state.get(record.info_hash)
                     if torrent_info:
                         torrent_tags = torrent_info.get("tags", [])
                         
@@ -223,6 +232,8 @@ async def upload_torrent_file(
     if not downloader:
         raise HTTPException(status_code=404, detail="下载器不存在")
     
+    torrent_path = None
+    torrent_created = False
     try:
         # 读取文件内容
         content = await file.read()
@@ -235,40 +246,29 @@ async def upload_torrent_file(
         torrent_size = 0.0
         
         try:
-            # 解析种子文件
-            import bencodepy
-            torrent_data = bencodepy.decode(content)
-            
-            # M-Team种子的ID在comment字段中
-            comment = torrent_data.get(b'comment', b'')
-            if isinstance(comment, bytes):
-                comment = comment.decode('utf-8')
+            # 扫描种子文件（不完整解码，只提取需要的字段）
+            meta = scan_torrent(content)
             
-            # comment字段直接就是种子ID（纯数字）
-            if comment and comment.isdigit():
+            # M-Team种子的ID在comment字段中，comment字段直接就是种子ID（纯数字）
+            comment = (meta.comment or "").strip()
+            if comment.isdigit():
                 torrent_id = comment
                 print(f"[Upload] 从comment字段提取到种子ID: {torrent_id}")
             
             # 获取种子内部名称（下载器使用的名称）
-            info = torrent_data.get(b'info', {})
-            internal_name = info.get(b'name', b'')
-            if isinstance(internal_name, bytes):
-                torrent_internal_name = internal_name.decode('utf-8')
+            if meta.name:
+                torrent_internal_name = meta.name
                 print(f"[Upload] 种子内部名称: {torrent_internal_name}")
             
-            # 获取种子大小
-            if b'length' in info:
-                torrent_size = float(info[b'length'])
-            elif b'files' in info:
-                # 多文件种子
-                torrent_size = sum(f.get(b'length', 0) for f in info[b'files'])
+            # 获取种子大小（多文件种子为所有文件之和）
+            torrent_size = float(meta.total_size)
             
             # 如果有关联账号和种子ID，通过API查询促销信息
             if account_id and torrent_id:
                 account = db.query(Account).filter(Account.id == account_id).first()
                 if account and account.api_key:
                     try:
-                        from services.scraper import MTeamAPI
+                        from services.scraper import MTeamAPI, parse_discount_end_time
                         api = MTeamAPI(account.api_key)
                         detail_result = await api.get_torrent_detail(torrent_id)
                         
@@ -281,14 +281,7 @@ async def upload_torrent_file(
                             # 解析促销到期时间
                             if discount_end_time_raw:
                                 try:
-                                    if isinstance(discount_end_time_raw, (int, float)):
-                                        # 时间戳格式（毫秒）
-                                        discount_end_time = datetime.fromtimestamp(
-                                            discount_end_time_raw / 1000 if discount_end_time_raw > 1e10 else discount_end_time_raw
-                                        )
-                                    elif isinstance(discount_end_time_raw, str):
-                                        # ISO格式字符串
-                                        discount_end_time = datetime.fromisoformat(discount_end_time_raw.replace("Z", "+00:00"))
+                                    discount_end_time = parse_discount_end_time(discount_end_time_raw)
                                 except Exception as e:
                                     print(f"[Upload] 解析促销到期时间失败: {e}")
                             
@@ -301,23 +294,13 @@ async def upload_torrent_file(
         except Exception as e:
             print(f"[Upload] 解析种子文件失败: {e}")
         
-        # 保存种子文件
-        torrent_filename = f"upload_{beijing_now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
-        torrent_path = TORRENT_DIR / torrent_filename
-        
-        with open(torrent_path, "wb") as f:
-            f.write(content)
+        # 保存种子文件（按 info_hash 存储，重复上传复用同一文件）
+        _, torrent_path, torrent_created = save_torrent(db, content, account_id, torrent_id)
         
-        # 处理标签
+        # 处理标签（不存在的标签由 add_torrent 创建）
         tag_list = []
         if tags:
             tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-            
-            # 确保标签在下载器中存在
-            existing_tags = await get_tags(downloader)
-            new_tags = [tag for tag in tag_list if tag not in existing_tags]
-            if new_tags:
-                await create_tags(downloader, new_tags)
         
         # 添加到下载器
         info_hash = await add_torrent(downloader, str(torrent_path), save_path, tag_list)
@@ -345,6 +328,7 @@ async def upload_torrent_file(
         
         db.add(history_record)
         db.commit()
+        schedule_expiry(history_record)
         
         return {
             "success": True,
@@ -364,8 +348,8 @@ async def upload_torrent_file(
         
     except Exception as e:
         db.rollback()
-        # 清理已保存的文件
-        if 'torrent_path' in locals() and torrent_path.exists():
+        # 清理本次新保存的文件（已存在的文件可能被其他记录使用）
+        if torrent_created and torrent_path and torrent_path.exists():
             os.remove(torrent_path)
         
         raise HTTPException(
@@ -404,8 +388,6 @@ async def sync_download_status(
     Args:
         import_first: 如果为 True，先从下载器导入新种子再同步状态
     """
-    from services.downloader import get_all_torrents_with_details
-    
     imported_count = 0
     
     # 如果需要先导入种子
@@ -421,7 +403,10 @@ async def sync_download_status(
         
         for downloader in downloaders:
             try:
-                torrents = await get_all_torrents_with_details(downloader)
+                downloader_state = await get_downloader_state(downloader, max_age=MANUAL_SYNC_MAX_AGE)
+                if downloader_state is None:
+                    raise RuntimeError("获取下载器状态失败")
+                torrents = list(downloader_state.torrents.values())
                 print(f"[Import] 下载器 {downloader.name} 中有 {len(torrents)} 个种子")
                 
                 for torrent in torrents:
@@ -505,9 +490,11 @@ async def sync_download_status(
             continue
         
         try:
-            # 批量获取该下载器的所有种子信息
-            all_torrents = await get_all_torrents_with_details(downloader)
-            torrent_info_map = {t.get("hash", "").lower(): t for t in all_torrents}
+            # 从下载器共享状态获取该下载器的所有种子信息
+            downloader_state = await get_downloader_state(downloader, max_age=MANUAL_SYNC_MAX_AGE)
+            if downloader_state is None:
+                raise RuntimeError("获取下载器状态失败")
+            torrent_info_map = downloader_state.torrents
             
             # 批量更新该下载器的所有记录
             for record in downloader_records:
@@ -581,8 +568,6 @@ async def import_from_downloader(
     如果指定 downloader_id，只导入该下载器的种子；否则导入所有下载器的种子。
     只导入数据库中不存在的种子（根据 info_hash 判断）。
     """
-    from services.downloader import get_all_torrents_with_details
-    
     # 获取要导入的下载器列表
     if downloader_id:
         downloaders = db.query(Downloader).filter(
@@ -611,8 +596,11 @@ async def import_from_downloader(
     
     for downloader in downloaders:
         try:
-            # 获取下载器中的所有种子
-            torrents = await get_all_torrents_with_details(downloader)
+            # 获取下载器中的所有种子（共享状态）
+            downloader_state = await get_downloader_state(downloader, max_age=MANUAL_SYNC_MAX_AGE)
+            if downloader_state is None:
+                raise RuntimeError("获取下载器状态失败")
+            torrents = list(downloader_state.torrents.values())
             print(f"[Import] 下载器 {downloader.name} 中有 {len(torrents)} 个种子")
             
             for torrent in torrents:
@@ -714,6 +702,7 @@ async def clear_deleted_history(db: Session = Depends(get_db)):
     
     count = len(records)
     for record in records:
+        forget_seen_torrents(record.account_id, [record.torrent_id])
         db.delete(record)
     db.commit()
     
@@ -752,6 +741,7 @@ async def delete_history(history_id: int, db: Session = Depends(get_db)):
     try:
         db.delete(history)
         db.commit()
+        forget_seen_torrents(history.account_id, [history.torrent_id])
         print(f"[History] 数据库记录删除成功: {history.torrent_name}")
     except Exception as e:
         db.rollback()
@@ -799,6 +789,7 @@ async def clear_history(
     for record in records:
         db.delete(record)
     db.commit()
+    forget_seen_torrents(account_id)
     
     return {
         "success": True, 
@@ -8,7 +8,8 @@ from datetime import datetime
 from database import get_db
 from models import Account, DownloadHistory
 from services.scraper import MTeamAPI, parse_torrent
-from config import TORRENT_DIR
+from services.metadata import get_metadata as get_cached_metadata
+from services.torrent_store import fetch_torrent
 
 router = APIRouter(prefix="/torrents", tags=["种子管理"])
 
@@ -41,6 +42,9 @@ class TorrentResponse(BaseModel):
     is_2x: bool
     created_date: str
     labels: List[str]
+    
+    class Config:
+        from_attributes = True
 
 class TorrentListResponse(BaseModel):
     success: bool
@@ -77,13 +81,13 @@ async def search_torrents(params: TorrentSearchParams, db: Session = Depends(get
     
     # 本地过滤（大小、做种数）
     if params.min_size_gb is not None:
-        torrents = [t for t in torrents if t["size_gb"] >= params.min_size_gb]
+        torrents = [t for t in torrents if t.size_gb >= params.min_size_gb]
     if params.max_size_gb is not None:
-        torrents = [t for t in torrents if t["size_gb"] <= params.max_size_gb]
+        torrents = [t for t in torrents if t.size_gb <= params.max_size_gb]
     if params.min_seeders is not None:
-        torrents = [t for t in torrents if t["seeders"] >= params.min_seeders]
+        torrents = [t for t in torrents if t.seeders >= params.min_seeders]
     if params.max_seeders is not None:
-        torrents = [t for t in torrents if t["seeders"] <= params.max_seeders]
+        torrents = [t for t in torrents if t.seeders <= params.max_seeders]
     
     return TorrentListResponse(
         success=True,
@@ -104,12 +108,13 @@ async def get_categories(
         raise HTTPException(status_code=404, detail="账号不存在或未配置")
     
     api = MTeamAPI(account.api_key)
-    result = await api.get_categories()
+    data = await get_cached_metadata(api, ["categories"])
+    categories = data.get("categories")
     
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=result.get("error"))
+    if isinstance(categories, dict) and "error" in categories:
+        raise HTTPException(status_code=500, detail=categories["error"])
     
-    return {"success": True, "data": result["data"]}
+    return {"success": True, "data": categories}
 
 @router.get("/metadata")
 async def get_metadata(
@@ -117,43 +122,17 @@ async def get_metadata(
     types: str = Query("categories", description="获取的元数据类型，用逗号分隔：categories,sources,mediums,standards,videoCodecs,audioCodecs,teams,processings"),
     db: Session = Depends(get_db)
 ):
-    """获取种子元数据（分类、来源、介质等）"""
+    """获取种子元数据（分类、来源、介质等）
+    
+    元数据持久化缓存，未命中的类型并发获取，过期的类型在后台刷新。
+    """
     account = db.query(Account).filter(Account.id == account_id).first()
     if not account or not account.api_key:
         raise HTTPException(status_code=404, detail="账号不存在或未配置")
     
     api = MTeamAPI(account.api_key)
-    result_data = {}
-    
     type_list = [t.strip() for t in types.split(",")]
-    
-    for metadata_type in type_list:
-        try:
-            if metadata_type == "categories":
-                result = await api.get_categories()
-            elif metadata_type == "sources":
-                result = await api.get_source_list()
-            elif metadata_type == "mediums":
-                result = await api.get_medium_list()
-            elif metadata_type == "standards":
-                result = await api.get_standard_list()
-            elif metadata_type == "videoCodecs":
-                result = await api.get_video_codec_list()
-            elif metadata_type == "audioCodecs":
-                result = await api.get_audio_codec_list()
-            elif metadata_type == "teams":
-                result = await api.get_team_list()
-            elif metadata_type == "processings":
-                result = await api.get_processing_list()
-            else:
-                continue
-            
-            if result["success"]:
-                result_data[metadata_type] = result["data"]
-            else:
-                result_data[metadata_type] = {"error": result.get("error")}
-        except Exception as e:
-            result_data[metadata_type] = {"error": str(e)}
+    result_data = await get_cached_metadata(api, type_list)
     
     return {"success": True, "data": result_data}
 
@@ -189,21 +168,12 @@ async def download_torrent(
     
     api = MTeamAPI(account.api_key)
     
-    # 获取下载链接
-    result = await api.gen_download_token(torrent_id)
-    if not result["success"]:
-        raise HTTPException(status_code=500, detail=result.get("error"))
-    
-    download_url = result["data"]
-    
-    # 下载种子文件
-    torrent_content = await api.download_torrent(torrent_id)
-    if not torrent_content:
+    # 优先使用本地已保存的种子文件，否则下载并保存
+    fetched = await fetch_torrent(api, db, account.id, torrent_id)
+    if not fetched:
         raise HTTPException(status_code=500, detail="下载种子文件失败")
     
-    # 保存到本地
-    torrent_path = TORRENT_DIR / f"{torrent_id}.torrent"
-    torrent_path.write_bytes(torrent_content)
+    torrent_content = fetched[0]
     
     return Response(
         content=torrent_content,
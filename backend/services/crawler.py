@@ -0,0 +1,303 @@
+"""
+规则搜索的增量抓取
+按（账号、模式、促销、分类）记录已处理过的种子位置（游标），
+每次从第一页向后翻页，直到遇到已处理过的种子为止
+
+游标只在本轮种子全部交给规则处理完之后才推进（commit_crawl_cursors），
+没有处理完的种子（下载队列已满、获取或推送失败）下一轮会重新抓取：
+
+- last_*：顶部已处理区间的最新位置，第一段翻页到这里为止
+- 单次翻页达到上限、或中间有未处理完的种子时，会留下一段未处理的空档：
+  gap_floor_* 以下（含）全部已处理，resume_* 是空档上方已处理区间的最旧位置，
+  resume_page 是它所在的页码，下一轮从这一页继续向后翻，直到空档被补齐
+"""
+
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.orm import Session
+
+from models import CrawlCursor
+from services.scraper import MTeamAPI, parse_torrent
+
+# 每页数量
+CRAWL_PAGE_SIZE = 50
+# 单轮最多翻页数（两段翻页合计），超过的部分留到下一轮继续
+CRAWL_MAX_PAGES = 10
+
+Position = Tuple[str, int]
+
+
+def make_cursor_key(account_id: int, mode: str, categories: Optional[List[str]], discount: Optional[str]) -> str:
+    """生成游标键：账号 + 模式 + 促销 + 排序后的分类"""
+    category_part = ",".join(sorted(str(c) for c in categories)) if categories else "*"
+    return f"{account_id}:{mode}:{discount or '*'}:{category_part}"
+
+
+def _position(created_date: Optional[str], torrent_id: Any) -> Position:
+    """种子在 CREATED_DATE 倒序列表中的位置（发布时间，ID）"""
+    torrent_id = str(torrent_id or "")
+    return (created_date or "", int(torrent_id) if torrent_id.isdigit() else 0)
+
+
+def _stored_position(created_date: Optional[str], torrent_id: Optional[str]) -> Optional[Position]:
+    return _position(created_date, torrent_id) if created_date else None
+
+
+class CrawlBatch:
+    """一个游标键在本轮的抓取结果
+
+    同一游标键的规则共享一次抓取（consumers 为规则数量），每个规则处理完一个种子后调用
+    mark_done，所有规则都处理完的种子才允许游标越过它。
+    """
+
+    def __init__(self, account_id: int, cursor_key: str, mode: str,
+                 categories: Optional[List[str]], discount: Optional[str]):
+        self.account_id = account_id
+        self.cursor_key = cursor_key
+        self.mode = mode
+        self.categories = categories
+        self.discount = discount
+        self.consumers = 0
+        self.result: Optional[Dict[str, Any]] = None  # 抓取成功后的结果，失败时为 None
+        self._done: Dict[str, int] = {}
+        # 抓取过程记录，用于推进游标
+        self.positions: Dict[str, Position] = {}  # 种子 ID -> 位置
+        self.pages: Dict[Position, int] = {}  # 位置 -> 所在页码
+        self.covered: List[Tuple[Optional[Position], Position]] = []  # 连续翻过的区间（下界 None 表示到底）
+
+    def mark_done(self, torrent_id: str) -> None:
+        self._done[torrent_id] = self._done.get(torrent_id, 0) + 1
+
+    def undone_positions(self) -> List[Position]:
+        return sorted(
+            position for torrent_id, position in self.positions.items()
+            if self._done.get(torrent_id, 0) < self.consumers
+        )
+
+
+def get_crawl_batch(
+    cycle_cache: Dict[str, CrawlBatch],
+    account_id: int,
+    mode: str,
+    categories: Optional[List[str]] = None,
+    discount: Optional[str] = None
+) -> CrawlBatch:
+    """获取（或创建）本轮的抓取批次并登记一个使用它的规则
+
+    规则即使因下载队列已满等原因跳过抓取也要登记，否则同一游标键的其他规则推进游标后它会漏掉种子。
+    """
+    cursor_key = make_cursor_key(account_id, mode, categories, discount)
+    batch = cycle_cache.get(cursor_key)
+    if batch is None:
+        batch = cycle_cache[cursor_key] = CrawlBatch(account_id, cursor_key, mode, categories, discount)
+    batch.consumers += 1
+    return batch
+
+
+async def _walk(
+    api: MTeamAPI,
+    batch: CrawlBatch,
+    start_page: int,
+    stop_at: Optional[Position],
+    max_pages: int,
+    torrents: List[Any],
+    must_reach: Optional[Position] = None
+) -> Tuple[bool, int]:
+    """从 start_page 向后翻页，直到遇到不晚于 stop_at 的种子、到达列表末尾或达到页数上限
+
+    Args:
+        must_reach: 第一页的最新种子必须不早于该位置（用于续翻：列表变化导致页码偏移时向前退一页）
+
+    Returns:
+        (是否已连续翻到 stop_at 或列表末尾, 实际请求的页数)；第一页请求失败时抛出 RuntimeError
+    """
+    page = start_page
+    requested = 0
+    top: Optional[Position] = None
+    bottom: Optional[Position] = None
+
+    while requested < max_pages:
+        result = await api.search_torrents(
+            page=page,
+            page_size=CRAWL_PAGE_SIZE,
+            mode=batch.mode,
+            categories=batch.categories,
+            discount=batch.discount
+        )
+        requested += 1
+
+        if not result["success"]:
+            if top is None:
+                raise RuntimeError(result.get("error") or "搜索失败")
+            print(f"[Crawler] {batch.cursor_key} 第 {page} 页抓取失败，下一轮重新抓取: {result.get('error')}")
+            break
+
+        data = result["data"] or {}
+        rows = [parse_torrent(t, lean=True) for t in data.get("data", [])]
+        positions = [_position(t.created_date, t.id) for t in rows]
+
+        if top is None and must_reach is not None and page > 1 and (not positions or max(positions) < must_reach):
+            # 续翻的起始页已越过上次的位置（网站上有种子被删除），退回一页
+            page -= 1
+            continue
+
+        for t, position in zip(rows, positions):
+            if t.id not in batch.positions:
+                torrents.append(t)
+            batch.positions[t.id] = position
+            batch.pages.setdefault(position, page)
+        if positions:
+            top = max(top, max(positions)) if top else max(positions)
+            bottom = min(positions)
+
+        total = int(data.get("total", 0) or 0)
+        if len(rows) < CRAWL_PAGE_SIZE or page * CRAWL_PAGE_SIZE >= total:
+            if top is not None:
+                batch.covered.append((None, top))
+            return True, requested
+        if stop_at is None or (bottom is not None and bottom <= stop_at):
+            batch.covered.append((bottom if stop_at is not None else None, top))
+            return True, requested
+        page += 1
+
+    if top is not None:
+        batch.covered.append((bottom, top))
+    return False, requested
+
+
+async def crawl_new_torrents(api: MTeamAPI, db: Session, batch: CrawlBatch) -> Dict[str, Any]:
+    """增量抓取种子列表
+
+    总是返回第一页的全部种子（保证晚于发布时间才加入促销的种子仍能被看到），
+    如果第一页全是新种子则继续翻页，直到遇到上次处理过的位置；
+    上次留有空档时再从 resume_page 继续向后翻页补齐空档。
+    两段翻页合计不超过 CRAWL_MAX_PAGES 页，没翻到的部分留到下一轮，不会跳过。
+
+    游标不在这里推进，本轮处理完成后调用 commit_crawl_cursors。
+
+    Returns:
+        {"success": bool, "torrents": [...], "pages": int, "error": str}
+    """
+    if batch.result is not None:
+        return batch.result
+
+    cursor = db.query(CrawlCursor).filter(CrawlCursor.cursor_key == batch.cursor_key).first()
+    last = _stored_position(cursor.last_created_date, cursor.last_torrent_id) if cursor else None
+    resume = _stored_position(cursor.resume_created_date, cursor.resume_torrent_id) if cursor else None
+
+    torrents: List[Any] = []
+    try:
+        reached, pages = await _walk(api, batch, 1, last, CRAWL_MAX_PAGES, torrents)
+    except RuntimeError as e:
+        batch.positions.clear()
+        batch.pages.clear()
+        batch.covered.clear()
+        return {"success": False, "torrents": [], "pages": 0, "error": str(e)}
+
+    if reached and resume and pages < CRAWL_MAX_PAGES:
+        # 上次留下的空档：新种子把列表向后推了若干页
+        shift = sum(1 for p in batch.positions.values() if p > last) // CRAWL_PAGE_SIZE
+        floor = _stored_position(cursor.gap_floor_created_date, cursor.gap_floor_torrent_id)
+        start_page = max(1, (cursor.resume_page or 1) + shift)
+        try:
+            _, resumed = await _walk(
+                api, batch, start_page, floor, CRAWL_MAX_PAGES - pages, torrents, must_reach=resume
+            )
+            pages += resumed
+        except RuntimeError as e:
+            print(f"[Crawler] {batch.cursor_key} 续翻第 {start_page} 页失败，下一轮重试: {e}")
+    elif not reached:
+        print(f"[Crawler] {batch.cursor_key} 新种子超过 {CRAWL_MAX_PAGES} 页，更早的部分下一轮继续抓取")
+
+    if pages > 1:
+        print(f"[Crawler] {batch.cursor_key} 本轮翻页 {pages} 页，获取 {len(torrents)} 个种子")
+
+    batch.result = {"success": True, "torrents": torrents, "pages": pages}
+    return batch.result
+
+
+def _merge(intervals: List[Tuple[Optional[Position], Position]]) -> List[Tuple[Optional[Position], Position]]:
+    """合并有重叠的区间（下界 None 表示到底），按下界升序返回"""
+    ordered = sorted(intervals, key=lambda i: (i[0] is not None, i[0] or ("", 0)))
+    merged: List[Tuple[Optional[Position], Position]] = []
+    for low, high in ordered:
+        if merged and (low is None or low <= merged[-1][1]):
+            prev_low, prev_high = merged[-1]
+            merged[-1] = (prev_low, max(prev_high, high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def _advance_cursor(cursor: CrawlCursor, batch: CrawlBatch) -> None:
+    """根据本轮翻过的区间和各种子的处理结果推进游标"""
+    last = _stored_position(cursor.last_created_date, cursor.last_torrent_id)
+    resume = _stored_position(cursor.resume_created_date, cursor.resume_torrent_id)
+    floor = _stored_position(cursor.gap_floor_created_date, cursor.gap_floor_torrent_id) if resume else last
+
+    # 已处理的区间：上次游标记录的区间 + 本轮翻过的区间
+    intervals = list(batch.covered)
+    if floor is not None:
+        intervals.append((None, floor))
+    if resume and last:
+        intervals.append((resume, last))
+    merged = _merge(intervals)
+    if not merged or merged[0][0] is not None:
+        return
+
+    undone = batch.undone_positions()
+    seen = sorted(set(batch.positions.values()) | {p for p in (floor, resume, last) if p})
+
+    # 底部：到第一个未处理完的种子之前，以下全部已处理
+    new_floor = merged[0][1]
+    if undone and undone[0] <= new_floor:
+        below = [p for p in seen if p < undone[0]]
+        new_floor = below[-1] if below else floor
+    if new_floor is None:
+        # 第一次抓取就有未处理完的种子，下一轮重新开始
+        return
+
+    # 顶部：最后一个未处理完的种子之后，到最新的种子为止
+    top_low, top_high = merged[-1]
+    top_undone = [p for p in undone if top_low is None or p >= top_low]
+    if top_undone:
+        above = [p for p in seen if p > top_undone[-1]]
+        top_low = above[0] if above else None
+
+    if len(merged) == 1 and not undone:
+        new_last, new_resume = top_high, None
+    elif top_low is None:
+        # 顶部没有已处理的部分，下一轮从第一页翻到 new_floor
+        new_last, new_resume = new_floor, None
+    else:
+        new_last, new_resume = top_high, top_low
+
+    cursor.last_created_date, cursor.last_torrent_id = new_last[0], str(new_last[1])
+    if new_resume is None:
+        cursor.resume_created_date = cursor.resume_torrent_id = cursor.resume_page = None
+        cursor.gap_floor_created_date = cursor.gap_floor_torrent_id = None
+        return
+
+    page = batch.pages.get(new_resume)
+    if page is None:
+        # 本轮没有翻到空档上沿，按新种子数量估算页码偏移
+        shift = sum(1 for p in batch.positions.values() if last and p > last) // CRAWL_PAGE_SIZE
+        page = (cursor.resume_page or 1) + shift
+    cursor.resume_created_date, cursor.resume_torrent_id = new_resume[0], str(new_resume[1])
+    cursor.resume_page = page
+    cursor.gap_floor_created_date, cursor.gap_floor_torrent_id = new_floor[0], str(new_floor[1])
+
+
+def commit_crawl_cursors(db: Session, cycle_cache: Dict[str, CrawlBatch]) -> None:
+    """本轮处理完成后推进各游标（跳过抓取失败的批次）"""
+    for batch in cycle_cache.values():
+        if batch.result is None:
+            continue
+        cursor = db.query(CrawlCursor).filter(CrawlCursor.cursor_key == batch.cursor_key).first()
+        if not cursor:
+            cursor = CrawlCursor(account_id=batch.account_id, cursor_key=batch.cursor_key)
+            db.add(cursor)
+        _advance_cursor(cursor, batch)
+        undone = len(batch.undone_positions())
+        if undone:
+            print(f"[Crawler] {batch.cursor_key} 有 {undone} 个种子未处理完，下一轮重新抓取")
+    db.commit()
@@ -1,50 +1,224 @@
-from typing import Optional, List, Dict, Any
-import qbittorrentapi
-from transmission_rpc import Client as TransmissionClient
+import asyncio
+import base64
+import os
+from typing import Optional, List, Dict, Any, Tuple
 
+from services.qbittorrent import QBittorrentClient, MainDataMirror
+from services.transmission import TransmissionClient, TransmissionError, tr_status
+from utils.bencode import compute_info_hash
+from utils.circuit_breaker import CircuitBreaker, get_circuit_breaker, remove_circuit_breaker, probe_url
 
-def _get_qb_client(downloader):
-    """获取 qBittorrent 客户端"""
+
+def _base_url(downloader) -> str:
+    """下载器 WebUI 地址"""
     protocol = "https" if getattr(downloader, 'use_ssl', False) else "http"
-    host = f"{protocol}://{downloader.host}"
-    
-    client = qbittorrentapi.Client(
-        host=host,
-        port=downloader.port,
+    return f"{protocol}://{downloader.host}:{downloader.port}"
+
+
+def get_downloader_breaker(downloader) -> CircuitBreaker:
+    """获取下载器的熔断器，熔断期间在后台探测 WebUI 是否恢复"""
+    url = _base_url(downloader)
+    return get_circuit_breaker(
+        f"downloader:{downloader.id}",
+        name=f"下载器 {downloader.id}:{downloader.name}",
+        probe=lambda: probe_url(url)
+    )
+
+
+# 已连接的下载器客户端池，key 为 Downloader.id，value 为 (配置指纹, 客户端)
+# qBittorrent 客户端保存 SID，Transmission 客户端保存 X-Transmission-Session-Id
+_client_pool: Dict[int, Tuple[tuple, Any]] = {}
+
+
+def _fingerprint(downloader) -> tuple:
+    """下载器连接配置指纹，配置变化后池中的客户端失效"""
+    return (
+        downloader.type,
+        downloader.host,
+        downloader.port,
+        downloader.username,
+        downloader.password,
+        bool(getattr(downloader, 'use_ssl', False))
+    )
+
+
+def _pooled_client(downloader):
+    """从连接池取出配置未变的客户端"""
+    pooled = _client_pool.get(downloader.id)
+    if pooled and pooled[0] == _fingerprint(downloader):
+        return pooled[1]
+    return None
+
+
+def _new_qb_client(downloader) -> QBittorrentClient:
+    return QBittorrentClient(
+        _base_url(downloader),
         username=downloader.username,
         password=downloader.password,
-        VERIFY_WEBUI_CERTIFICATE=False,
-        REQUESTS_ARGS={'timeout': (3, 5)}  # 连接超时3秒，读取超时5秒
+        breaker=get_downloader_breaker(downloader)
     )
-    client.auth_log_in()
-    return client
 
 
-def _get_tr_client(downloader):
-    """获取 Transmission 客户端"""
-    protocol = "https" if getattr(downloader, 'use_ssl', False) else "http"
+def _new_tr_client(downloader) -> TransmissionClient:
     return TransmissionClient(
-        host=downloader.host,
-        port=downloader.port,
+        _base_url(downloader),
         username=downloader.username,
         password=downloader.password,
-        protocol=protocol,
-        timeout=5  # 5秒超时
+        breaker=get_downloader_breaker(downloader)
     )
 
 
+# Transmission 各操作请求的字段（只取需要的字段，避免返回 peers、files 等大字段）
+TR_INFO_FIELDS = ["hashString", "name", "percentDone", "status", "totalSize", "downloadedEver"]
+TR_DETAIL_FIELDS = TR_INFO_FIELDS + ["addedDate", "uploadRatio", "uploadedEver"]
+TR_STATE_FIELDS = TR_DETAIL_FIELDS + ["rateDownload", "rateUpload"]
+
+# qBittorrent 种子状态分类（与 WebUI 的 downloading / seeding 过滤器一致）
+QB_DOWNLOADING_STATES = frozenset({
+    "downloading", "metaDL", "forcedMetaDL", "stalledDL", "checkingDL",
+    "pausedDL", "stoppedDL", "queuedDL", "forcedDL"
+})
+QB_SEEDING_STATES = frozenset({"uploading", "stalledUP", "checkingUP", "queuedUP", "forcedUP"})
+
+# qBittorrent 镜像在该秒数内同步过时直接读取，同一轮任务中的多次查询只同步一次
+QB_MIRROR_MAX_AGE = 1.0
+
+
+def _qb_torrent_info(t: Dict[str, Any]) -> Dict[str, Any]:
+    """镜像中的 qBittorrent 种子转换为种子信息（包含标签）"""
+    progress = t.get("progress", 0)
+    return {
+        "hash": t["hash"],
+        "name": t.get("name"),
+        "progress": progress * 100,
+        "state": t.get("state"),
+        "size": t.get("size", 0),
+        "downloaded": t.get("downloaded", 0),
+        "is_completed": progress >= 1.0,
+        "tags": [tag.strip() for tag in (t.get("tags") or "").split(',') if tag.strip()]
+    }
+
+
+def _qb_torrent_detail(t: Dict[str, Any]) -> Dict[str, Any]:
+    """镜像中的 qBittorrent 种子转换为详细信息（额外包含添加时间、分享率、上传量）"""
+    info = _qb_torrent_info(t)
+    info.update({
+        "added_on": t.get("added_on", 0),  # 添加时间戳
+        "ratio": t.get("ratio", 0),
+        "uploaded": t.get("uploaded", 0)
+    })
+    return info
+
+
+def _tr_torrent_detail(t: Dict[str, Any]) -> Dict[str, Any]:
+    """Transmission 种子转换为详细信息（格式与 qBittorrent 一致）"""
+    info = _tr_torrent_info(t)
+    info.update({
+        "added_on": t.get("addedDate") or 0,
+        "ratio": t.get("uploadRatio", 0),
+        "uploaded": t.get("uploadedEver", 0),
+        "tags": []  # Transmission 不支持标签
+    })
+    return info
+
+
+def _tr_torrent_info(t: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为与 qBittorrent 一致的种子信息格式"""
+    percent_done = t.get("percentDone", 0)
+    return {
+        "hash": t["hashString"],
+        "name": t.get("name"),
+        "progress": percent_done * 100,
+        "state": tr_status(t.get("status")),
+        "size": t.get("totalSize", 0),
+        "downloaded": t.get("downloadedEver", 0),
+        "is_completed": percent_done >= 1.0
+    }
+
+
+def release_downloader(downloader_id: int) -> None:
+    """释放下载器相关的运行时状态（下载器配置修改或被删除时调用）"""
+    from services.downloader_state import release_downloader_state
+    _client_pool.pop(downloader_id, None)
+    remove_circuit_breaker(f"downloader:{downloader_id}")
+    release_downloader_state(downloader_id)
+
+
+def _mark_state_stale(downloader_id: int) -> None:
+    """下载器中的种子有增删，共享状态下次读取时重新获取"""
+    from services.downloader_state import invalidate_downloader_state
+    invalidate_downloader_state(downloader_id)
+
+
+async def _get_qb_client(downloader) -> QBittorrentClient:
+    """获取 qBittorrent 客户端，熔断中直接抛出 CircuitOpenError
+    
+    客户端按下载器缓存，首次请求时登录，之后复用 SID，失效时自动重新登录。
+    """
+    get_downloader_breaker(downloader).check()
+    client = _pooled_client(downloader)
+    if client is None:
+        client = _new_qb_client(downloader)
+        _client_pool[downloader.id] = (_fingerprint(downloader), client)
+    return client
+
+
+async def _get_qb_mirror(downloader, max_age: float = QB_MIRROR_MAX_AGE) -> MainDataMirror:
+    """增量同步并返回 qBittorrent 的种子镜像"""
+    client = await _get_qb_client(downloader)
+    return await client.sync(max_age=max_age)
+
+
+def _get_tr_client(downloader) -> TransmissionClient:
+    """获取 Transmission 客户端，熔断中直接抛出 CircuitOpenError
+    
+    客户端按下载器缓存，复用 X-Transmission-Session-Id。
+    """
+    get_downloader_breaker(downloader).check()
+    client = _pooled_client(downloader)
+    if client is None:
+        client = _new_tr_client(downloader)
+        _client_pool[downloader.id] = (_fingerprint(downloader), client)
+    return client
+
+
+async def _tr_free_space(client: TransmissionClient) -> int:
+    """获取 Transmission 下载目录所在磁盘的剩余空间（字节）
+    
+    优先用 free-space RPC 查询实际下载目录；新版本可能移除 session 的
+    download-dir-free-space 字段，只在 free-space 失败时才回退到该字段。
+    """
+    session = await client.session_get(fields=["download-dir", "download-dir-free-space"])
+    download_dir = session.get("download-dir")
+    if download_dir:
+        try:
+            size = await client.free_space(download_dir)
+            if size is not None:
+                return size
+        except TransmissionError as e:
+            print(f"[Downloader] Transmission free-space 查询失败，回退到会话字段: {e}")
+    return session.get("download-dir-free-space") or 0
+
+
 async def test_downloader_connection(downloader) -> dict:
-    """测试下载器连接"""
+    """测试下载器连接
+    
+    手动测试不受熔断器限制，测试结果会同步到熔断器（成功即恢复）。
+    """
     try:
+        # 连接结果由客户端自动回报给熔断器
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            version = client.app.version
+            client = _new_qb_client(downloader)
+            await client.login()
+            version = await client.app_version()
+            _client_pool[downloader.id] = (_fingerprint(downloader), client)
             return {"success": True, "message": f"连接成功，版本: {version}"}
         
         elif downloader.type == "transmission":
-            client = _get_tr_client(downloader)
-            session = client.get_session()
-            return {"success": True, "message": f"连接成功，版本: {session.version}"}
+            client = _new_tr_client(downloader)
+            session = await client.session_get(fields=["version"])
+            _client_pool[downloader.id] = (_fingerprint(downloader), client)
+            return {"success": True, "message": f"连接成功，版本: {session.get('version')}"}
         
         else:
             return {"success": False, "message": "不支持的下载器类型"}
@@ -52,9 +226,17 @@ async def test_downloader_connection(downloader) -> dict:
     except Exception as e:
         return {"success": False, "message": f"连接失败: {str(e)}"}
 
-async def add_torrent(downloader, torrent_path: str, save_path: Optional[str] = None, tags: Optional[List[str]] = None) -> Optional[str]:
+async def add_torrent(
+    downloader,
+    torrent_path: str,
+    save_path: Optional[str] = None,
+    tags: Optional[List[str]] = None
+) -> Optional[str]:
     """添加种子到下载器
     
+    先在本地计算 info_hash 并检查下载器中是否已有该种子，已有则直接返回，
+    否则添加种子后立即返回，不等待下载器处理。
+    
     Args:
         downloader: 下载器配置对象
         torrent_path: 种子文件路径
@@ -69,56 +251,50 @@ async def add_torrent(downloader, torrent_path: str, save_path: Optional[str] =
         with open(torrent_path, "rb") as f:
             torrent_content = f.read()
         
+        # 直接对原始 info 字典字节做 SHA1，不需要完整解码
+        info_hash = compute_info_hash(torrent_content)
+        
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
+            client = await _get_qb_client(downloader)
+            
+            # 已在下载器中则不重复添加（查询增量同步的镜像）
+            mirror = await client.sync(max_age=QB_MIRROR_MAX_AGE)
+            if info_hash and info_hash in mirror.torrents:
+                print(f"[Downloader] 种子已在下载器中: {info_hash}")
+                return info_hash
             
             # 如果有标签，先确保标签存在
             if tags:
-                existing_tags = set(client.torrents_tags() or [])
-                new_tags = [t for t in tags if t not in existing_tags]
+                new_tags = await client.ensure_tags(tags)
                 if new_tags:
-                    client.torrents_create_tags(tags=new_tags)
                     print(f"[Downloader] 创建新标签: {new_tags}")
             
-            kwargs = {"torrent_files": torrent_content}
-            if save_path:
-                kwargs["save_path"] = save_path
-            if tags:
-                kwargs["tags"] = ",".join(tags)
-            
             # 添加种子
-            client.torrents_add(**kwargs)
-            
-            # 尝试获取刚添加的种子的 hash
-            # qBittorrent 添加后需要等待一下才能获取
-            import time
-            time.sleep(1)
+            added = await client.torrents_add(
+                torrent_content,
+                filename=os.path.basename(torrent_path),
+                save_path=save_path,
+                tags=tags
+            )
+            if not added:
+                print(f"[Downloader] 下载器拒绝添加种子: {torrent_path}")
+                return None
+            _mark_state_stale(downloader.id)
             
-            # 从种子文件解析 info_hash
-            import hashlib
-            try:
-                import bencodepy
-                torrent_data = bencodepy.decode(torrent_content)
-                info = torrent_data[b'info']
-                info_hash = hashlib.sha1(bencodepy.encode(info)).hexdigest()
-                return info_hash
-            except:
-                # 如果解析失败，返回 True 表示添加成功但无法获取 hash
-                return "unknown"
+            # 无法解析 info_hash 时返回 "unknown" 表示添加成功但没有 hash
+            return info_hash or "unknown"
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
             
-            import base64
-            torrent_b64 = base64.b64encode(torrent_content).decode()
-            
-            kwargs = {"torrent": torrent_b64}
-            if save_path:
-                kwargs["download_dir"] = save_path
+            # 已存在的种子 Transmission 会返回 torrent-duplicate，不会重复添加
             # Transmission 不支持标签
-            
-            result = client.add_torrent(**kwargs)
-            return result.hashString if result else None
+            result = await client.torrent_add(
+                base64.b64encode(torrent_content).decode(),
+                download_dir=save_path
+            )
+            _mark_state_stale(downloader.id)
+            return result.get("hashString") if result else None
         
         return None
     
@@ -139,36 +315,20 @@ async def get_torrent_info(downloader, info_hash: str) -> Optional[Dict[str, Any
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            torrents = client.torrents_info(torrent_hashes=info_hash)
+            mirror = await _get_qb_mirror(downloader)
+            t = mirror.torrents.get(info_hash.lower())
             
-            if torrents:
-                t = torrents[0]
-                return {
-                    "hash": t.hash,
-                    "name": t.name,
-                    "progress": t.progress * 100,  # 转为百分比
-                    "state": t.state,
-                    "size": t.size,
-                    "downloaded": t.downloaded,
-                    "is_completed": t.progress >= 1.0
-                }
+            if t:
+                info = _qb_torrent_info(t)
+                del info["tags"]
+                return info
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents(ids=[info_hash])
+            torrents = await client.torrent_get(TR_INFO_FIELDS, ids=[info_hash])
             
             if torrents:
-                t = torrents[0]
-                return {
-                    "hash": t.hashString,
-                    "name": t.name,
-                    "progress": t.progress,
-                    "state": t.status,
-                    "size": t.total_size,
-                    "downloaded": t.downloaded_ever,
-                    "is_completed": t.progress >= 100
-                }
+                return _tr_torrent_info(torrents[0])
         
         return None
     
@@ -190,20 +350,16 @@ async def delete_torrent(downloader, info_hash: str, delete_files: bool = True)
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            client.torrents_delete(
-                torrent_hashes=info_hash,
-                delete_files=delete_files
-            )
+            client = await _get_qb_client(downloader)
+            await client.torrents_delete([info_hash], delete_files=delete_files)
+            _mark_state_stale(downloader.id)
             print(f"[Downloader] 已删除种子: {info_hash}")
             return True
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            client.remove_torrent(
-                ids=[info_hash],
-                delete_data=delete_files
-            )
+            await client.torrent_remove([info_hash], delete_local_data=delete_files)
+            _mark_state_stale(downloader.id)
             print(f"[Downloader] 已删除种子: {info_hash}")
             return True
         
@@ -214,6 +370,42 @@ async def delete_torrent(downloader, info_hash: str, delete_files: bool = True)
         return False
 
 
+async def delete_torrents(downloader, info_hashes: List[str], delete_files: bool = True) -> bool:
+    """批量删除种子，一次请求删除所有 hash
+    
+    Args:
+        downloader: 下载器配置对象
+        info_hashes: 种子哈希列表
+        delete_files: 是否同时删除文件
+    
+    Returns:
+        是否成功
+    """
+    info_hashes = [h for h in dict.fromkeys(info_hashes) if h]
+    if not info_hashes:
+        return True
+    
+    try:
+        if downloader.type == "qbittorrent":
+            client = await _get_qb_client(downloader)
+            await client.torrents_delete(info_hashes, delete_files=delete_files)
+        
+        elif downloader.type == "transmission":
+            client = _get_tr_client(downloader)
+            await client.torrent_remove(info_hashes, delete_local_data=delete_files)
+        
+        else:
+            return False
+        
+        _mark_state_stale(downloader.id)
+        print(f"[Downloader] 已删除 {len(info_hashes)} 个种子")
+        return True
+    
+    except Exception as e:
+        print(f"[Downloader] 批量删除种子失败: {e}")
+        return False
+
+
 async def get_incomplete_torrents(downloader) -> List[Dict[str, Any]]:
     """获取所有未完成的种子列表
     
@@ -222,29 +414,27 @@ async def get_incomplete_torrents(downloader) -> List[Dict[str, Any]]:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
+            mirror = await _get_qb_mirror(downloader)
             # 获取所有下载中的种子
-            torrents = client.torrents_info(status_filter="downloading")
-            
             return [{
-                "hash": t.hash,
-                "name": t.name,
-                "progress": t.progress * 100,
-                "state": t.state,
-                "size": t.size
-            } for t in torrents]
+                "hash": t["hash"],
+                "name": t.get("name"),
+                "progress": t.get("progress", 0) * 100,
+                "state": t.get("state"),
+                "size": t.get("size", 0)
+            } for t in mirror.torrents.values() if t.get("state") in QB_DOWNLOADING_STATES]
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents()
+            torrents = await client.torrent_get(["hashString", "name", "percentDone", "status", "totalSize"])
             
             return [{
-                "hash": t.hashString,
-                "name": t.name,
-                "progress": t.progress,
-                "state": t.status,
-                "size": t.total_size
-            } for t in torrents if t.progress < 100]
+                "hash": t["hashString"],
+                "name": t["name"],
+                "progress": t["percentDone"] * 100,
+                "state": tr_status(t["status"]),
+                "size": t["totalSize"]
+            } for t in torrents if t["percentDone"] < 1.0]
         
         return []
     
@@ -261,9 +451,8 @@ async def get_tags(downloader) -> List[str]:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            tags = client.torrents_tags()
-            return list(tags) if tags else []
+            mirror = await _get_qb_mirror(downloader)
+            return sorted(mirror.tags)
         
         elif downloader.type == "transmission":
             # Transmission 不支持标签功能
@@ -288,13 +477,10 @@ async def create_tags(downloader, tags: List[str]) -> bool:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 获取现有标签
-            existing_tags = set(client.torrents_tags() or [])
+            client = await _get_qb_client(downloader)
             # 创建不存在的标签
-            new_tags = [t for t in tags if t not in existing_tags]
+            new_tags = await client.ensure_tags(tags)
             if new_tags:
-                client.torrents_create_tags(tags=new_tags)
                 print(f"[Downloader] 创建标签: {new_tags}")
             return True
         
@@ -317,15 +503,14 @@ async def get_downloading_count(downloader) -> int:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 获取所有下载中的种子（包括暂停的下载任务）
-            torrents = client.torrents_info(status_filter="downloading")
-            return len(torrents)
+            mirror = await _get_qb_mirror(downloader)
+            # 统计所有下载中的种子（包括暂停的下载任务）
+            return sum(1 for t in mirror.torrents.values() if t.get("state") in QB_DOWNLOADING_STATES)
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents()
-            return len([t for t in torrents if t.progress < 100])
+            torrents = await client.torrent_get(["percentDone"])
+            return len([t for t in torrents if t["percentDone"] < 1.0])
         
         return 0
     
@@ -342,16 +527,18 @@ async def get_seeding_count(downloader) -> int:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 获取所有上传中的种子（做种状态）
-            torrents = client.torrents_info(status_filter="uploading")
-            return len(torrents)
+            mirror = await _get_qb_mirror(downloader)
+            # 统计所有做种中的种子（与 qBittorrent 的 seeding 过滤器一致）
+            return sum(1 for t in mirror.torrents.values() if t.get("state") in QB_SEEDING_STATES)
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents()
-            # Transmission 中进度100%且正在上传的为做种状态
-            return len([t for t in torrents if t.progress >= 100 and t.status in ['seeding', 'seed_wait']])
+            torrents = await client.torrent_get(["percentDone", "status"])
+            # Transmission 中进度100%且正在上传（或等待上传）的为做种状态
+            return len([
+                t for t in torrents
+                if t["percentDone"] >= 1.0 and tr_status(t["status"]) in ("seeding", "seed pending")
+            ])
         
         return 0
     
@@ -360,6 +547,45 @@ async def get_seeding_count(downloader) -> int:
         return 0
 
 
+async def fetch_downloader_state(downloader) -> Dict[str, Any]:
+    """获取下载器的完整状态：所有种子的详细信息和服务器状态
+    
+    qBittorrent 增量同步一次 sync/maindata 镜像，Transmission 并发请求一次 torrent-get 和下载目录的 free-space。
+    与其他函数不同，失败时直接抛出异常，避免调用方把"获取失败"误当成"种子不存在"。
+    一般不直接调用，而是通过 services.downloader_state 读取带缓存的快照。
+    
+    Returns:
+        {"torrents": {小写 hash: 种子详细信息}, "download_speed", "upload_speed",
+         "connection_status", "free_space_bytes"}
+    """
+    if downloader.type == "qbittorrent":
+        mirror = await _get_qb_mirror(downloader)
+        server_state = mirror.server_state
+        return {
+            "torrents": {h: _qb_torrent_detail(t) for h, t in mirror.torrents.items()},
+            "download_speed": server_state.get("dl_info_speed", 0),
+            "upload_speed": server_state.get("up_info_speed", 0),
+            "connection_status": server_state.get("connection_status", "connected"),
+            "free_space_bytes": server_state.get("free_space_on_disk", 0)
+        }
+    
+    if downloader.type == "transmission":
+        client = _get_tr_client(downloader)
+        torrents, free_space = await asyncio.gather(
+            client.torrent_get(TR_STATE_FIELDS),
+            _tr_free_space(client)
+        )
+        return {
+            "torrents": {t["hashString"].lower(): _tr_torrent_detail(t) for t in torrents},
+            "download_speed": sum(t.get("rateDownload", 0) for t in torrents),
+            "upload_speed": sum(t.get("rateUpload", 0) for t in torrents),
+            "connection_status": "connected",
+            "free_space_bytes": free_space
+        }
+    
+    raise ValueError(f"不支持的下载器类型: {downloader.type}")
+
+
 async def get_torrent_info_with_tags(downloader, info_hash: str) -> Optional[Dict[str, Any]]:
     """获取种子信息（包含标签）
     
@@ -372,42 +598,18 @@ async def get_torrent_info_with_tags(downloader, info_hash: str) -> Optional[Dic
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            torrents = client.torrents_info(torrent_hashes=info_hash)
+            mirror = await _get_qb_mirror(downloader)
+            t = mirror.torrents.get(info_hash.lower())
             
-            if torrents:
-                t = torrents[0]
-                # 获取标签列表
-                tags = t.tags.split(',') if t.tags else []
-                tags = [tag.strip() for tag in tags if tag.strip()]
-                
-                return {
-                    "hash": t.hash,
-                    "name": t.name,
-                    "progress": t.progress * 100,
-                    "state": t.state,
-                    "size": t.size,
-                    "downloaded": t.downloaded,
-                    "is_completed": t.progress >= 1.0,
-                    "tags": tags
-                }
+            if t:
+                return _qb_torrent_info(t)
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents(ids=[info_hash])
+            torrents = await client.torrent_get(TR_INFO_FIELDS, ids=[info_hash])
             
             if torrents:
-                t = torrents[0]
-                return {
-                    "hash": t.hashString,
-                    "name": t.name,
-                    "progress": t.progress,
-                    "state": t.status,
-                    "size": t.total_size,
-                    "downloaded": t.downloaded_ever,
-                    "is_completed": t.progress >= 100,
-                    "tags": []  # Transmission 不支持标签
-                }
+                return {**_tr_torrent_info(torrents[0]), "tags": []}  # Transmission 不支持标签
         
         return None
     
@@ -416,6 +618,41 @@ async def get_torrent_info_with_tags(downloader, info_hash: str) -> Optional[Dic
         return None
 
 
+async def get_torrents_info_with_tags(downloader, info_hashes: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+    """批量获取种子信息（包含标签），qBittorrent 查询镜像，Transmission 一次请求查询所有 hash
+    
+    Args:
+        downloader: 下载器配置对象
+        info_hashes: 种子哈希列表
+    
+    Returns:
+        {hash: 种子信息}，下载器中不存在的种子不会出现在结果中；请求失败返回 None
+    """
+    info_hashes = [h for h in dict.fromkeys(info_hashes) if h]
+    if not info_hashes:
+        return {}
+    
+    try:
+        result = {}
+        if downloader.type == "qbittorrent":
+            mirror = await _get_qb_mirror(downloader)
+            for info_hash in info_hashes:
+                t = mirror.torrents.get(info_hash.lower())
+                if t:
+                    result[info_hash.lower()] = _qb_torrent_info(t)
+        
+        elif downloader.type == "transmission":
+            client = _get_tr_client(downloader)
+            for t in await client.torrent_get(TR_INFO_FIELDS, ids=info_hashes):
+                result[t["hashString"].lower()] = {**_tr_torrent_info(t), "tags": []}
+        
+        return result
+    
+    except Exception as e:
+        print(f"[Downloader] 批量获取种子信息失败: {e}")
+        return None
+
+
 async def get_disk_space_info(downloader) -> Optional[Dict[str, Any]]:
     """获取磁盘空间信息
     
@@ -427,12 +664,11 @@ async def get_disk_space_info(downloader) -> Optional[Dict[str, Any]]:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 使用 sync_maindata 获取服务器状态信息
-            maindata = client.sync_maindata()
+            # 服务器状态来自 sync/maindata 镜像
+            mirror = await _get_qb_mirror(downloader)
             
-            if maindata and "server_state" in maindata:
-                server_state = maindata["server_state"]
+            if mirror.server_state:
+                server_state = mirror.server_state
                 
                 # 提取磁盘空间相关信息
                 disk_info = {}
@@ -458,17 +694,14 @@ async def get_disk_space_info(downloader) -> Optional[Dict[str, Any]]:
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            # Transmission 的 session 信息中包含一些统计数据
-            session = client.get_session()
+            session = await client.session_get(fields=["download-dir"])
             
             disk_info = {}
             
-            # Transmission 没有直接的磁盘空间 API，但可以获取下载目录
-            if hasattr(session, 'download_dir'):
-                disk_info["download_dir"] = session.download_dir
+            # Transmission 没有直接的磁盘空间字段，这里只返回下载目录
+            if session.get("download-dir"):
+                disk_info["download_dir"] = session["download-dir"]
             
-            # 可以通过系统调用获取磁盘空间（需要额外实现）
-            # 这里先返回基本信息
             return disk_info
         
         return None
@@ -486,44 +719,13 @@ async def get_all_torrents_with_details(downloader) -> List[Dict[str, Any]]:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            torrents = client.torrents_info()
-            
-            result = []
-            for t in torrents:
-                result.append({
-                    "hash": t.hash,
-                    "name": t.name,
-                    "size": t.size,
-                    "added_on": t.added_on,  # 添加时间戳
-                    "ratio": t.ratio,
-                    "state": t.state,
-                    "progress": t.progress * 100,
-                    "downloaded": t.downloaded,
-                    "uploaded": t.uploaded,
-                    "tags": t.tags.split(',') if t.tags else []
-                })
-            return result
+            mirror = await _get_qb_mirror(downloader)
+            return [_qb_torrent_detail(t) for t in mirror.torrents.values()]
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            torrents = client.get_torrents()
-            
-            result = []
-            for t in torrents:
-                result.append({
-                    "hash": t.hashString,
-                    "name": t.name,
-                    "size": t.total_size,
-                    "added_on": t.date_added.timestamp() if t.date_added else 0,
-                    "ratio": t.ratio,
-                    "state": t.status,
-                    "progress": t.progress,
-                    "downloaded": t.downloaded_ever,
-                    "uploaded": t.uploaded_ever,
-                    "tags": []  # Transmission 不支持标签
-                })
-            return result
+            torrents = await client.torrent_get(TR_DETAIL_FIELDS)
+            return [_tr_torrent_detail(t) for t in torrents]
         
         return []
     
@@ -662,65 +864,6 @@ async def delete_torrents_by_strategy(
     except Exception as e:
         print(f"[Downloader] 动态删种失败: {e}")
         return []
-    """获取磁盘空间信息
-    
-    Args:
-        downloader: 下载器配置对象
-    
-    Returns:
-        磁盘空间信息字典，包含剩余空间等信息
-    """
-    try:
-        if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 使用 sync_maindata 获取服务器状态信息
-            maindata = client.sync_maindata()
-            
-            if maindata and "server_state" in maindata:
-                server_state = maindata["server_state"]
-                
-                # 提取磁盘空间相关信息
-                disk_info = {}
-                
-                # 剩余磁盘空间（字节）
-                if "free_space_on_disk" in server_state:
-                    disk_info["free_space_bytes"] = server_state["free_space_on_disk"]
-                    # 转换为更友好的单位
-                    free_gb = server_state["free_space_on_disk"] / (1024 ** 3)
-                    disk_info["free_space_gb"] = round(free_gb, 2)
-                
-                # 其他可能的服务器状态信息
-                if "dl_info_speed" in server_state:
-                    disk_info["download_speed"] = server_state["dl_info_speed"]
-                if "up_info_speed" in server_state:
-                    disk_info["upload_speed"] = server_state["up_info_speed"]
-                if "dl_info_data" in server_state:
-                    disk_info["total_downloaded"] = server_state["dl_info_data"]
-                if "up_info_data" in server_state:
-                    disk_info["total_uploaded"] = server_state["up_info_data"]
-                
-                return disk_info
-        
-        elif downloader.type == "transmission":
-            client = _get_tr_client(downloader)
-            # Transmission 的 session 信息中包含一些统计数据
-            session = client.get_session()
-            
-            disk_info = {}
-            
-            # Transmission 没有直接的磁盘空间 API，但可以获取下载目录
-            if hasattr(session, 'download_dir'):
-                disk_info["download_dir"] = session.download_dir
-            
-            # 可以通过系统调用获取磁盘空间（需要额外实现）
-            # 这里先返回基本信息
-            return disk_info
-        
-        return None
-    
-    except Exception as e:
-        print(f"[Downloader] 获取磁盘空间信息失败: {e}")
-        return None
 
 
 async def get_server_stats(downloader) -> Optional[Dict[str, Any]]:
@@ -734,12 +877,11 @@ async def get_server_stats(downloader) -> Optional[Dict[str, Any]]:
     """
     try:
         if downloader.type == "qbittorrent":
-            client = _get_qb_client(downloader)
-            # 获取主数据，包含服务器状态
-            maindata = client.sync_maindata()
+            # 服务器状态来自 sync/maindata 镜像
+            mirror = await _get_qb_mirror(downloader)
             
-            if maindata and "server_state" in maindata:
-                server_state = maindata["server_state"]
+            if mirror.server_state:
+                server_state = mirror.server_state
                 
                 stats = {
                     "connection_status": server_state.get("connection_status", "unknown"),
@@ -762,28 +904,32 @@ async def get_server_stats(downloader) -> Optional[Dict[str, Any]]:
         
         elif downloader.type == "transmission":
             client = _get_tr_client(downloader)
-            session = client.get_session()
+            session = await client.session_get(fields=[
+                "version", "download-dir",
+                "speed-limit-down-enabled", "speed-limit-up-enabled",
+                "speed-limit-down", "speed-limit-up"
+            ])
             
             stats = {
-                "version": getattr(session, 'version', 'unknown'),
-                "download_dir": getattr(session, 'download_dir', ''),
-                "speed_limit_down_enabled": getattr(session, 'speed_limit_down_enabled', False),
-                "speed_limit_up_enabled": getattr(session, 'speed_limit_up_enabled', False),
-                "speed_limit_down": getattr(session, 'speed_limit_down', 0),
-                "speed_limit_up": getattr(session, 'speed_limit_up', 0),
+                "version": session.get("version", "unknown"),
+                "download_dir": session.get("download-dir", ""),
+                "speed_limit_down_enabled": session.get("speed-limit-down-enabled", False),
+                "speed_limit_up_enabled": session.get("speed-limit-up-enabled", False),
+                "speed_limit_down": session.get("speed-limit-down", 0),
+                "speed_limit_up": session.get("speed-limit-up", 0),
             }
             
             # 获取统计信息
             try:
-                session_stats = client.get_session_stats()
-                if session_stats:
-                    stats.update({
-                        "download_speed": getattr(session_stats, 'downloadSpeed', 0),
-                        "upload_speed": getattr(session_stats, 'uploadSpeed', 0),
-                        "total_downloaded": getattr(session_stats, 'cumulative_stats', {}).get('downloadedBytes', 0),
-                        "total_uploaded": getattr(session_stats, 'cumulative_stats', {}).get('uploadedBytes', 0),
-                    })
-            except:
+                session_stats = await client.session_stats()
+                cumulative = session_stats.get("cumulative-stats", {})
+                stats.update({
+                    "download_speed": session_stats.get("downloadSpeed", 0),
+                    "upload_speed": session_stats.get("uploadSpeed", 0),
+                    "total_downloaded": cumulative.get("downloadedBytes", 0),
+                    "total_uploaded": cumulative.get("uploadedBytes", 0),
+                })
+            except Exception:
                 pass
             
             return stats
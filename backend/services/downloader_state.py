@@ -0,0 +1,189 @@
+"""
+下载器状态服务
+每个下载器只有一处轮询：后台定时任务按固定间隔刷新所有启用的下载器，生成带时间戳的快照
+（所有种子的详细信息 + 速度、剩余空间等服务器状态）。
+
+状态同步、过期删种、动态删种、历史页面和仪表盘统一通过 get_downloader_state 读取：
+快照在 max_age 秒内刷新过就直接使用，否则立即刷新一次；同一下载器的并发刷新只会请求一次。
+添加、删除种子后快照被标记为过期，下次读取时一定会重新获取。
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+from config import settings
+from models import beijing_now
+from services.downloader import fetch_downloader_state, QB_DOWNLOADING_STATES, QB_SEEDING_STATES
+
+
+class DownloaderState:
+    """下载器在某一时刻的快照"""
+
+    def __init__(self, downloader_id: int, downloader_type: str, data: Dict[str, Any]):
+        self.downloader_id = downloader_id
+        self.downloader_type = downloader_type
+        self.torrents: Dict[str, Dict[str, Any]] = data["torrents"]  # key 为小写 hash
+        self.download_speed: int = data["download_speed"]
+        self.upload_speed: int = data["upload_speed"]
+        self.connection_status: str = data["connection_status"]
+        self.free_space_bytes: int = data["free_space_bytes"]
+        self.fetched_at: datetime = beijing_now()
+        self._fetched_monotonic = time.monotonic()
+        self.stale = False
+
+    @property
+    def free_space_gb(self) -> float:
+        return round(self.free_space_bytes / (1024 ** 3), 2)
+
+    def age(self) -> float:
+        """距获取快照的秒数"""
+        return time.monotonic() - self._fetched_monotonic
+
+    def is_fresh(self, max_age: float) -> bool:
+        return not self.stale and self.age() <= max_age
+
+    def get(self, info_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """按 hash 查找种子，不存在返回 None"""
+        if not info_hash:
+            return None
+        return self.torrents.get(info_hash.lower())
+
+    def is_downloading(self, torrent: Dict[str, Any]) -> bool:
+        if self.downloader_type == "qbittorrent":
+            return torrent["state"] in QB_DOWNLOADING_STATES
+        return not torrent["is_completed"]
+
+    def downloading_count(self) -> int:
+        """下载中（包括暂停的下载任务）的种子数量"""
+        return sum(1 for t in self.torrents.values() if self.is_downloading(t))
+
+    def is_seeding(self, torrent: Dict[str, Any]) -> bool:
+        if self.downloader_type == "qbittorrent":
+            return torrent["state"] in QB_SEEDING_STATES
+        return torrent["is_completed"] and torrent["state"] in ("seeding", "seed pending")
+
+    def summary(self, incomplete_limit: Optional[int] = None) -> Dict[str, Any]:
+        """概况：下载中/做种数量、未完成种子（按进度从高到低）、速度和剩余空间"""
+        incomplete = [{
+            "hash": t["hash"],
+            "name": t["name"],
+            "progress": t["progress"],
+            "state": t["state"],
+            "size": t["size"]
+        } for t in self.torrents.values() if self.is_downloading(t)]
+        incomplete.sort(key=lambda t: t["progress"], reverse=True)
+
+        return {
+            "downloading_count": len(incomplete),
+            "seeding_count": sum(1 for t in self.torrents.values() if self.is_seeding(t)),
+            "incomplete_torrents": incomplete if incomplete_limit is None else incomplete[:incomplete_limit],
+            "download_speed": self.download_speed,
+            "upload_speed": self.upload_speed,
+            "connection_status": self.connection_status,
+            "free_space_bytes": self.free_space_bytes,
+            "free_space_gb": self.free_space_gb
+        }
+
+
+# 各下载器最近一次的快照和刷新锁，key 为 Downloader.id
+_states: Dict[int, DownloaderState] = {}
+_locks: Dict[int, asyncio.Lock] = {}
+_refresh_stats: Dict[int, Dict[str, Any]] = {}
+# 各下载器的失效计数，每次 invalidate_downloader_state 加一；
+# 刷新期间计数变化说明快照可能早于种子增删，刷新结果直接标记为过期
+_generations: Dict[int, int] = {}
+
+
+async def get_downloader_state(downloader, max_age: Optional[float] = None) -> Optional[DownloaderState]:
+    """获取下载器快照，超过 max_age 秒未刷新则立即刷新
+
+    Args:
+        downloader: 下载器配置对象
+        max_age: 可接受的快照年龄（秒），默认 DOWNLOADER_STATE_MAX_AGE；0 表示一定重新获取
+
+    Returns:
+        快照，刷新失败返回 None（调用方应跳过本次处理，而不是把种子当作不存在）
+    """
+    if max_age is None:
+        max_age = settings.DOWNLOADER_STATE_MAX_AGE
+
+    state = _states.get(downloader.id)
+    if state and state.is_fresh(max_age):
+        return state
+
+    lock = _locks.setdefault(downloader.id, asyncio.Lock())
+    async with lock:
+        # 等待锁期间其他请求可能已经刷新
+        state = _states.get(downloader.id)
+        if state and state.is_fresh(max_age):
+            return state
+        return await _refresh(downloader)
+
+
+async def _refresh(downloader) -> Optional[DownloaderState]:
+    stats = _refresh_stats.setdefault(downloader.id, {"refresh_count": 0, "error_count": 0, "last_error": None})
+    start = time.monotonic()
+    generation = _generations.get(downloader.id, 0)
+    try:
+        data = await fetch_downloader_state(downloader)
+    except Exception as e:
+        stats["error_count"] += 1
+        stats["last_error"] = str(e)
+        print(f"[DownloaderState] 刷新下载器 {downloader.name} 状态失败: {e}")
+        return None
+
+    state = DownloaderState(downloader.id, downloader.type, data)
+    if _generations.get(downloader.id, 0) != generation:
+        # 刷新期间有种子增删，数据可以先用，但下次读取会重新获取
+        state.stale = True
+    _states[downloader.id] = state
+    stats["refresh_count"] += 1
+    stats["last_error"] = None
+    stats["last_duration"] = round(time.monotonic() - start, 3)
+    return state
+
+
+async def refresh_downloader_states(downloaders: List[Any]) -> None:
+    """并发刷新多个下载器（后台轮询调用）
+
+    最近半个刷新间隔内已被其他请求刷新过的下载器不再重复请求。
+    """
+    max_age = settings.DOWNLOADER_STATE_REFRESH_INTERVAL / 2
+    await asyncio.gather(*[get_downloader_state(d, max_age=max_age) for d in downloaders])
+
+
+def invalidate_downloader_state(downloader_id: int) -> None:
+    """标记快照已过期（种子有增删时调用），保留旧数据直到下次刷新
+
+    同时增加失效计数，正在进行的刷新完成后也会被标记为过期。
+    """
+    _generations[downloader_id] = _generations.get(downloader_id, 0) + 1
+    state = _states.get(downloader_id)
+    if state:
+        state.stale = True
+
+
+def release_downloader_state(downloader_id: int) -> None:
+    """丢弃下载器的快照（下载器配置修改或被删除时调用）"""
+    _states.pop(downloader_id, None)
+    _locks.pop(downloader_id, None)
+    _refresh_stats.pop(downloader_id, None)
+    _generations.pop(downloader_id, None)
+
+
+def get_downloader_state_stats() -> List[Dict[str, Any]]:
+    """各下载器快照的状态（用于调度器状态页面）"""
+    result = []
+    for downloader_id, stats in _refresh_stats.items():
+        state = _states.get(downloader_id)
+        result.append({
+            "downloader_id": downloader_id,
+            "fetched_at": state.fetched_at.isoformat() if state else None,
+            "age": round(state.age(), 1) if state else None,
+            "stale": state.stale if state else None,
+            "torrent_count": len(state.torrents) if state else 0,
+            **stats
+        })
+    return result
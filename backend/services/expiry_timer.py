@@ -0,0 +1,167 @@
+"""
+促销到期定时器
+按下载历史的促销到期时间（discount_end_time）在到期时（或提前 EXPIRY_TIMER_MARGIN 秒）触发删种，
+不需要每分钟轮询数据库和下载器：
+
+- 启动时从数据库重建所有下载中种子的到期时间
+- 推送、上传种子后调用 schedule_expiry 加入定时器
+- 到期时间存放在最小堆中，后台任务睡眠到最早的到期时间，到期的记录一起交给回调批量处理
+- 非免费促销的种子在推送 EXPIRY_PUSH_GRACE 秒后处理，等下载器添加完成
+
+定时器只保存在内存中，定期的过期检查任务作为对账兜底（处理遗漏或处理失败的记录）。
+"""
+
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import settings
+from models import IN_FLIGHT_STATUSES, FREE_DISCOUNT_TYPES, beijing_now
+
+# 最长睡眠时间（秒），定期醒来重新计算，避免系统时间调整后错过到期时间
+MAX_SLEEP_SECONDS = 300
+
+
+def expiry_deadline(record) -> Optional[datetime]:
+    """下载历史记录的删种时间，不需要定时删除返回 None
+
+    - 非免费促销：推送 EXPIRY_PUSH_GRACE 秒后（已超过则立即）
+    - 免费促销：到期前 EXPIRY_TIMER_MARGIN 秒
+    """
+    if not record.info_hash or not record.downloader_id or record.status not in IN_FLIGHT_STATUSES:
+        return None
+    if record.discount_type and record.discount_type not in FREE_DISCOUNT_TYPES:
+        now = beijing_now()
+        if record.created_at is None:
+            return now + timedelta(seconds=settings.EXPIRY_PUSH_GRACE)
+        return max(now, record.created_at + timedelta(seconds=settings.EXPIRY_PUSH_GRACE))
+    if record.discount_end_time:
+        return record.discount_end_time - timedelta(seconds=settings.EXPIRY_TIMER_MARGIN)
+    return None
+
+
+class ExpiryTimer:
+    """到期时间最小堆 + 后台任务"""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._deadlines: Dict[int, datetime] = {}  # 下载历史 ID -> 当前有效的到期时间
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._callback: Optional[Callable[[List[int]], Awaitable[Any]]] = None
+        self.fired_count = 0
+        self.last_fired_at: Optional[datetime] = None
+
+    def schedule(self, history_id: int, deadline: datetime) -> None:
+        """加入或更新到期时间（旧的堆条目在弹出时跳过）"""
+        if self._deadlines.get(history_id) == deadline:
+            return
+        self._deadlines[history_id] = deadline
+        heapq.heappush(self._heap, (deadline, history_id))
+        if self._heap[0] == (deadline, history_id):
+            # 比当前等待的时间更早，唤醒后台任务重新计算
+            self._wakeup.set()
+        self._compact()
+
+    def cancel(self, history_id: int) -> None:
+        self._deadlines.pop(history_id, None)
+
+    def _compact(self) -> None:
+        """堆中过时的条目过多时重建"""
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(d, i) for i, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now: datetime) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, history_id = heapq.heappop(self._heap)
+            if self._deadlines.get(history_id) == deadline:
+                del self._deadlines[history_id]
+                due.append(history_id)
+        return due
+
+    def _seconds_until_next(self) -> float:
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return MAX_SLEEP_SECONDS
+        delay = (self._heap[0][0] - beijing_now()).total_seconds()
+        return min(max(delay, 0), MAX_SLEEP_SECONDS)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due(beijing_now())
+            if due:
+                self.fired_count += len(due)
+                self.last_fired_at = beijing_now()
+                try:
+                    await self._callback(due)
+                except Exception as e:
+                    # 处理失败的记录由定期对账任务兜底
+                    print(f"[ExpiryTimer] 处理到期种子失败: {e}")
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next())
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, callback: Callable[[List[int]], Awaitable[Any]]) -> None:
+        """启动后台任务（需要在事件循环中调用）"""
+        self._callback = callback
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap.clear()
+        self._deadlines.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        next_deadline = min(self._deadlines.values()) if self._deadlines else None
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "pending": len(self._deadlines),
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
+            "fired_count": self.fired_count,
+            "last_fired_at": self.last_fired_at.isoformat() if self.last_fired_at else None,
+            "margin_seconds": settings.EXPIRY_TIMER_MARGIN
+        }
+
+
+_timer = ExpiryTimer()
+
+
+def start_expiry_timer(callback: Callable[[List[int]], Awaitable[Any]], records: Iterable[Any]) -> None:
+    """从下载历史重建定时器并启动
+
+    Args:
+        callback: 到期时调用，参数为到期的下载历史 ID 列表
+        records: 数据库中下载中的下载历史记录
+    """
+    for record in records:
+        schedule_expiry(record)
+    _timer.start(callback)
+    print(f"[ExpiryTimer] 促销到期定时器已启动，待处理 {len(_timer._deadlines)} 个种子")
+
+
+def stop_expiry_timer() -> None:
+    _timer.stop()
+
+
+def schedule_expiry(record) -> None:
+    """按下载历史记录的促销信息加入（或更新）定时器，推送种子、促销信息变化后调用"""
+    deadline = expiry_deadline(record)
+    if deadline is None:
+        _timer.cancel(record.id)
+    else:
+        _timer.schedule(record.id, deadline)
+
+
+def get_expiry_timer_stats() -> Dict[str, Any]:
+    return _timer.stats()
@@ -0,0 +1,147 @@
+"""
+种子元数据缓存
+分类、来源、介质、编码、制作组等列表很少变化，持久化到数据库并设置较长的有效期：
+- 未命中的类型并发获取
+- 过期的类型先返回旧数据，同时在后台刷新
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from typing import Dict, Any, List, Set
+
+from database import SessionLocal
+from models import MetadataCache, beijing_now
+from services.scraper import MTeamAPI
+from config import settings
+
+# 缓存格式版本，修改存储结构时递增，旧缓存会被视为未命中
+METADATA_SCHEMA_VERSION = 1
+
+# 元数据类型 -> MTeamAPI 方法名
+METADATA_FETCHERS = {
+    "categories": "get_categories",
+    "sources": "get_source_list",
+    "mediums": "get_medium_list",
+    "standards": "get_standard_list",
+    "videoCodecs": "get_video_codec_list",
+    "audioCodecs": "get_audio_codec_list",
+    "teams": "get_team_list",
+    "processings": "get_processing_list",
+}
+
+# 正在后台刷新的类型，避免重复刷新
+_refreshing: Set[str] = set()
+# 后台刷新任务的引用（防止任务被垃圾回收）
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def _fetch(api: MTeamAPI, metadata_type: str) -> Dict[str, Any]:
+    """从 M-Team 获取单个类型的元数据"""
+    try:
+        return await getattr(api, METADATA_FETCHERS[metadata_type])()
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+
+def _save(results: Dict[str, Any]) -> None:
+    """保存获取成功的元数据"""
+    if not results:
+        return
+
+    db = SessionLocal()
+    try:
+        rows = {
+            row.metadata_type: row
+            for row in db.query(MetadataCache).filter(
+                MetadataCache.metadata_type.in_(list(results.keys()))
+            ).all()
+        }
+        now = beijing_now()
+        for metadata_type, data in results.items():
+            row = rows.get(metadata_type)
+            if not row:
+                row = MetadataCache(metadata_type=metadata_type)
+                db.add(row)
+            row.version = METADATA_SCHEMA_VERSION
+            row.data = json.dumps(data, ensure_ascii=False)
+            row.fetched_at = now
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _fetch_and_save(api: MTeamAPI, types: List[str]) -> Dict[str, Any]:
+    """并发获取多个类型的元数据并保存，返回 {类型: 接口结果}"""
+    results = await asyncio.gather(*[_fetch(api, t) for t in types])
+    fetched = dict(zip(types, results))
+    _save({t: r["data"] for t, r in fetched.items() if r["success"]})
+    return fetched
+
+
+async def _refresh_in_background(api: MTeamAPI, types: List[str]) -> None:
+    """后台刷新过期的元数据"""
+    try:
+        fetched = await _fetch_and_save(api, types)
+        failed = [t for t, r in fetched.items() if not r["success"]]
+        if failed:
+            print(f"[Metadata] 后台刷新失败: {failed}")
+    except Exception as e:
+        print(f"[Metadata] 后台刷新异常: {e}")
+    finally:
+        _refreshing.difference_update(types)
+
+
+async def get_metadata(api: MTeamAPI, types: List[str]) -> Dict[str, Any]:
+    """获取元数据（优先使用缓存）
+
+    Args:
+        api: 用于缓存未命中或刷新时请求 M-Team 的客户端
+        types: 元数据类型列表，未知类型会被忽略
+
+    Returns:
+        {类型: 数据}，获取失败的类型值为 {"error": 错误信息}
+    """
+    types = [t for t in dict.fromkeys(types) if t in METADATA_FETCHERS]
+    if not types:
+        return {}
+
+    db = SessionLocal()
+    try:
+        rows = db.query(MetadataCache).filter(MetadataCache.metadata_type.in_(types)).all()
+    finally:
+        db.close()
+
+    expire_before = beijing_now() - timedelta(seconds=settings.MTEAM_METADATA_TTL)
+    result_data: Dict[str, Any] = {}
+    stale = []
+
+    for row in rows:
+        if row.version != METADATA_SCHEMA_VERSION or not row.data:
+            continue
+        try:
+            result_data[row.metadata_type] = json.loads(row.data)
+        except json.JSONDecodeError:
+            continue
+        if row.fetched_at is None or row.fetched_at < expire_before:
+            stale.append(row.metadata_type)
+
+    # 未命中：并发获取
+    missing = [t for t in types if t not in result_data]
+    if missing:
+        fetched = await _fetch_and_save(api, missing)
+        for metadata_type, result in fetched.items():
+            if result["success"]:
+                result_data[metadata_type] = result["data"]
+            else:
+                result_data[metadata_type] = {"error": result.get("error")}
+
+    # 已过期：先返回旧数据，后台刷新
+    stale = [t for t in stale if t not in _refreshing]
+    if stale:
+        _refreshing.update(stale)
+        task = asyncio.create_task(_refresh_in_background(api, stale))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    return {t: result_data[t] for t in types if t in result_data}
@@ -0,0 +1,152 @@
+"""
+异步流水线
+由多个阶段组成，阶段之间用有界队列连接：
+
+- 每个阶段有独立的并发数（worker 数量），处理函数通过 emit 把结果交给下一阶段
+- 下一阶段的队列满时 emit 会等待（背压），慢的阶段只会让上游逐步放慢，不会无限堆积
+- 单个条目处理失败只记录错误，不影响其他条目
+- 每个阶段统计队列深度、处理中数量、处理数量、失败数量、耗时和吞吐量
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+# 队列结束标记
+_DONE = object()
+
+Emit = Callable[[Any], Awaitable[None]]
+Handler = Callable[[Any, Emit], Awaitable[None]]
+
+
+class Stage:
+    """流水线的一个阶段
+
+    Args:
+        name: 阶段名称（用于日志和统计）
+        handler: async handler(item, emit)，调用 await emit(x) 把 x 交给下一阶段，可以调用多次或不调用
+        concurrency: 同时处理的条目数
+        queue_size: 输入队列容量
+    """
+
+    def __init__(self, name: str, handler: Handler, concurrency: int = 1, queue_size: int = 50):
+        self.name = name
+        self.handler = handler
+        self.concurrency = max(1, concurrency)
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self.processed = 0
+        self.failed = 0
+        self.emitted = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.max_queue_depth = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "name": self.name,
+            "concurrency": self.concurrency,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "emitted": self.emitted,
+            "avg_latency": round(self.total_latency / self.processed, 3) if self.processed else None,
+            "max_latency": round(self.max_latency, 3),
+            "throughput": round(self.processed / elapsed, 2) if elapsed else None  # 每秒处理数
+        }
+
+
+class Pipeline:
+    """按顺序连接的多个阶段"""
+
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = stages
+        self.running = False
+        self.last_duration: Optional[float] = None
+
+    async def run(self, items: Iterable[Any]) -> None:
+        """把 items 送入第一个阶段，等待所有阶段处理完毕"""
+        for stage in self.stages:
+            stage._reset_stats()
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+
+        self.running = True
+        start = time.monotonic()
+        try:
+            tasks = [
+                asyncio.create_task(self._run_stage(i))
+                for i in range(len(self.stages))
+            ]
+            first = self.stages[0]
+            for item in items:
+                await self._put(first, item)
+            for _ in range(first.concurrency):
+                await first.queue.put(_DONE)
+            await asyncio.gather(*tasks)
+        finally:
+            self.running = False
+            self.last_duration = time.monotonic() - start
+
+    @staticmethod
+    async def _put(stage: Stage, item: Any) -> None:
+        await stage.queue.put(item)
+        stage.max_queue_depth = max(stage.max_queue_depth, stage.queue.qsize())
+
+    async def _run_stage(self, index: int) -> None:
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        async def emit(item: Any) -> None:
+            stage.emitted += 1
+            if next_stage is not None:
+                await self._put(next_stage, item)
+
+        async def worker() -> None:
+            while True:
+                item = await stage.queue.get()
+                if item is _DONE:
+                    return
+                if stage.started_at is None:
+                    stage.started_at = time.monotonic()
+                stage.in_flight += 1
+                start = time.monotonic()
+                try:
+                    await stage.handler(item, emit)
+                except Exception as e:
+                    stage.failed += 1
+                    print(f"[Pipeline] {self.name}/{stage.name} 处理失败: {e}")
+                finally:
+                    latency = time.monotonic() - start
+                    stage.in_flight -= 1
+                    stage.processed += 1
+                    stage.total_latency += latency
+                    stage.max_latency = max(stage.max_latency, latency)
+
+        try:
+            await asyncio.gather(*[worker() for _ in range(stage.concurrency)])
+        finally:
+            stage.finished_at = time.monotonic()
+            # 本阶段所有 worker 结束后通知下一阶段
+            if next_stage is not None:
+                for _ in range(next_stage.concurrency):
+                    await next_stage.queue.put(_DONE)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "stages": [stage.stats() for stage in self.stages]
+        }
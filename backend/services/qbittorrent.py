@@ -0,0 +1,306 @@
+"""
+qBittorrent WebUI 异步客户端
+基于 httpx 直接调用 WebUI API（/api/v2），不阻塞事件循环。
+所有下载器共用同一个 HTTP 连接池，登录状态（SID）保存在各自的客户端对象中，
+客户端首次请求时登录，之后复用 SID，只有在 SID 失效（403）时才重新登录。
+种子列表和服务器状态通过 sync/maindata 增量同步到本地镜像（MainDataMirror），
+读取操作查询镜像，每次同步只传输上次 rid 之后发生变化的字段。
+"""
+
+import asyncio
+import time
+
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Optional, List, Dict, Any
+
+import httpx
+
+from utils.circuit_breaker import CircuitBreaker
+
+# 已有标签列表的缓存时间（秒），WebUI 中删除的标签最迟在这之后重新创建
+KNOWN_TAGS_TTL = 300
+
+# 进程级共享的下载器 HTTP 客户端（下载器一般使用自签名证书，不校验证书）
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_downloader_http_client() -> httpx.AsyncClient:
+    """获取下载器共用的 HTTP 客户端
+    
+    共享客户端不保存 Cookie（拒绝所有域名），各下载器的登录状态由客户端对象自行携带。
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(5.0, connect=3.0),  # 连接超时3秒，读取超时5秒
+            verify=False,
+            cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        )
+    return _http_client
+
+
+async def close_downloader_http_client() -> None:
+    """关闭下载器共用的 HTTP 客户端（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+class QBittorrentError(Exception):
+    """qBittorrent 返回错误（登录失败、参数错误等）"""
+
+
+class MainDataMirror:
+    """sync/maindata 的本地镜像
+
+    qBittorrent 对每次响应分配 rid，请求时带上上次的 rid 只返回之后变化的部分：
+    种子和服务器状态只包含变化的字段，删除的种子在 torrents_removed 中。
+    rid 无效（如 qBittorrent 重启）时会返回 full_update，此时整体替换。
+    """
+
+    def __init__(self):
+        self.rid = 0
+        self.torrents: Dict[str, Dict[str, Any]] = {}  # key 为小写 hash
+        self.server_state: Dict[str, Any] = {}
+        self.tags: set = set()
+        self.synced_at: Optional[float] = None  # 上次同步的 time.monotonic()
+        self.sync_count = 0
+        self.full_update_count = 0
+
+    def apply(self, data: Dict[str, Any]) -> None:
+        """合并一次 sync/maindata 响应"""
+        if data.get("full_update"):
+            self.torrents = {}
+            self.server_state = {}
+            self.tags = set()
+            self.full_update_count += 1
+
+        for info_hash, changes in (data.get("torrents") or {}).items():
+            info_hash = info_hash.lower()
+            torrent = self.torrents.get(info_hash)
+            if torrent is None:
+                self.torrents[info_hash] = {**changes, "hash": info_hash}
+            else:
+                torrent.update(changes)
+        for info_hash in data.get("torrents_removed") or []:
+            self.torrents.pop(info_hash.lower(), None)
+
+        self.server_state.update(data.get("server_state") or {})
+        self.tags.update(data.get("tags") or [])
+        self.tags.difference_update(data.get("tags_removed") or [])
+
+        self.rid = data.get("rid", 0)
+        self.synced_at = time.monotonic()
+        self.sync_count += 1
+
+    def invalidate(self) -> None:
+        """标记镜像已过期（添加、删除种子后调用），下次读取时一定会同步"""
+        self.synced_at = None
+
+    def age(self) -> Optional[float]:
+        """距上次同步的秒数，从未同步返回 None"""
+        if self.synced_at is None:
+            return None
+        return time.monotonic() - self.synced_at
+
+
+class QBittorrentClient:
+    """qBittorrent WebUI API 客户端"""
+
+    def __init__(
+        self,
+        base_url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.username = username or ""
+        self.password = password or ""
+        self.breaker = breaker
+        self.sid: Optional[str] = None
+        self.logged_in = False
+        self.login_count = 0
+        self._known_tags: Optional[set] = None
+        self._known_tags_at = 0.0  # 上次查询标签列表的 time.monotonic()
+        self._login_lock = asyncio.Lock()
+        self.mirror = MainDataMirror()
+        self._sync_lock = asyncio.Lock()
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """发送请求，连接失败、超时和 5xx 计入熔断器"""
+        headers = kwargs.pop("headers", {})
+        # WebUI 会校验 Referer/Origin，防止 CSRF
+        headers.setdefault("Referer", self.base_url)
+        if self.sid:
+            headers["Cookie"] = f"SID={self.sid}"
+
+        try:
+            response = await get_downloader_http_client().request(
+                method, f"{self.base_url}/api/v2/{path}", headers=headers, **kwargs
+            )
+        except httpx.TransportError as e:
+            if self.breaker:
+                self.breaker.record_failure(e.__class__.__name__)
+            raise
+
+        if self.breaker:
+            if response.status_code >= 500:
+                self.breaker.record_failure(f"HTTP {response.status_code}")
+            else:
+                self.breaker.record_success()
+        return response
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """发送已登录的请求，SID 失效（403）时重新登录并重试一次，HTTP 错误抛出 QBittorrentError"""
+        if not self.logged_in:
+            await self._relogin(None)
+        sid = self.sid
+        response = await self._send(method, path, **kwargs)
+        if response.status_code == 403:
+            await self._relogin(sid)
+            response = await self._send(method, path, **kwargs)
+        if response.status_code != 200:
+            raise QBittorrentError(f"{path} 请求失败: HTTP {response.status_code} {response.text[:100]}")
+        return response
+
+    async def _relogin(self, expired_sid: Optional[str]) -> None:
+        """重新登录；并发请求同时发现 SID 失效时只登录一次"""
+        async with self._login_lock:
+            if self.logged_in and self.sid != expired_sid:
+                return
+            await self.login()
+
+    async def login(self) -> None:
+        """登录 WebUI，保存 SID"""
+        response = await self._send(
+            "POST",
+            "auth/login",
+            data={"username": self.username, "password": self.password}
+        )
+        self.logged_in = False
+        if response.status_code == 403:
+            raise QBittorrentError("登录失败次数过多，IP 已被 qBittorrent 暂时封禁")
+        if response.status_code != 200 or response.text.strip() != "Ok.":
+            raise QBittorrentError("登录失败，请检查用户名和密码")
+        # 对本机/白名单免认证时不会返回 SID
+        self.sid = response.cookies.get("SID") or self.sid
+        self.logged_in = True
+        self.login_count += 1
+
+    async def app_version(self) -> str:
+        """qBittorrent 版本"""
+        response = await self._request("GET", "app/version")
+        return response.text.strip()
+
+    async def torrents_info(
+        self,
+        hashes: Optional[List[str]] = None,
+        status_filter: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """获取种子列表
+
+        Args:
+            hashes: 只返回指定 hash 的种子
+            status_filter: 状态过滤（all、downloading、seeding、completed 等）
+            tag: 只返回带有该标签的种子
+        """
+        params = {}
+        if hashes:
+            params["hashes"] = "|".join(hashes)
+        if status_filter:
+            params["filter"] = status_filter
+        if tag is not None:
+            params["tag"] = tag
+        response = await self._request("GET", "torrents/info", params=params)
+        return response.json()
+
+    async def torrents_add(
+        self,
+        torrent_file: bytes,
+        filename: str = "upload.torrent",
+        save_path: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """添加种子文件，qBittorrent 拒绝添加（种子无效或已存在）时返回 False"""
+        data = {}
+        if save_path:
+            data["savepath"] = save_path
+        if tags:
+            data["tags"] = ",".join(tags)
+        try:
+            response = await self._request(
+                "POST",
+                "torrents/add",
+                data=data,
+                files={"torrents": (filename, torrent_file, "application/x-bittorrent")}
+            )
+        except Exception:
+            self.invalidate_tags()
+            raise
+        self.mirror.invalidate()
+        added = response.text.strip() != "Fails."
+        if not added and tags:
+            # 标签可能已在 WebUI 中被删除，下次重新查询
+            self.invalidate_tags()
+        return added
+
+    async def torrents_delete(self, hashes: List[str], delete_files: bool = True) -> None:
+        """删除种子"""
+        await self._request(
+            "POST",
+            "torrents/delete",
+            data={"hashes": "|".join(hashes), "deleteFiles": "true" if delete_files else "false"}
+        )
+        self.mirror.invalidate()
+
+    async def torrents_tags(self) -> List[str]:
+        """获取所有标签"""
+        response = await self._request("GET", "torrents/tags")
+        return response.json() or []
+
+    async def torrents_create_tags(self, tags: List[str]) -> None:
+        """创建标签"""
+        await self._request("POST", "torrents/createTags", data={"tags": ",".join(tags)})
+
+    def invalidate_tags(self) -> None:
+        """丢弃已有标签列表的缓存，下次 ensure_tags 重新查询"""
+        self._known_tags = None
+
+    async def ensure_tags(self, tags: List[str]) -> List[str]:
+        """确保标签存在，返回新创建的标签
+
+        已有标签列表缓存 KNOWN_TAGS_TTL 秒；添加种子或创建标签失败时会提前失效。
+        """
+        if self._known_tags is None or time.monotonic() - self._known_tags_at > KNOWN_TAGS_TTL:
+            self._known_tags = set(await self.torrents_tags())
+            self._known_tags_at = time.monotonic()
+        new_tags = [t for t in tags if t not in self._known_tags]
+        if new_tags:
+            try:
+                await self.torrents_create_tags(new_tags)
+            except Exception:
+                self.invalidate_tags()
+                raise
+            self._known_tags.update(new_tags)
+        return new_tags
+
+    async def sync_maindata(self, rid: int = 0) -> Dict[str, Any]:
+        """获取主数据（rid=0 为全量，否则为相对上次 rid 的增量）"""
+        response = await self._request("GET", "sync/maindata", params={"rid": rid})
+        return response.json()
+
+    async def sync(self, max_age: float = 0) -> MainDataMirror:
+        """增量同步本地镜像并返回
+
+        Args:
+            max_age: 镜像在该秒数内同步过则直接返回，不再请求；
+                并发调用只会有一个请求，其余等待后直接使用同步结果
+        """
+        async with self._sync_lock:
+            age = self.mirror.age()
+            if age is None or age > max_age:
+                self.mirror.apply(await self.sync_maindata(self.mirror.rid))
+        return self.mirror
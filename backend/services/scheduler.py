@@ -1,16 +1,26 @@
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 import json
 
 from database import SessionLocal
-from models import Account, FilterRule, DownloadHistory, Downloader, SystemSettings, beijing_now
-from services.scraper import MTeamAPI, parse_torrent
-from services.downloader import add_torrent, get_torrent_info, delete_torrent, get_downloading_count, get_torrent_info_with_tags, get_all_torrents_with_details, get_downloader_total_size, delete_torrents_by_strategy, delete_torrents_by_free_space, get_disk_space_info
+from models import Account, FilterRule, DownloadHistory, Downloader, SystemSettings, IN_FLIGHT_STATUSES, FREE_DISCOUNT_TYPES, beijing_now
+from services.scraper import MTeamAPI, parse_discount_end_time
+from services.crawler import CrawlBatch, get_crawl_batch, crawl_new_torrents, commit_crawl_cursors
+from services.torrent_store import fetch_torrent, gc_torrent_store
+from services.downloader import add_torrent, delete_torrents, delete_torrents_by_free_space
+from services.downloader_state import get_downloader_state, refresh_downloader_states, get_downloader_state_stats
+from services.expiry_timer import start_expiry_timer, stop_expiry_timer, schedule_expiry, get_expiry_timer_stats
+from services.pipeline import Pipeline, Stage
 from routers.rules import match_torrent
-from config import settings, TORRENT_DIR
+from utils.circuit_breaker import get_circuit_breaker_stats
+from config import settings
 
 scheduler = AsyncIOScheduler()
 
@@ -174,8 +184,474 @@ async def refresh_all_accounts():
     finally:
         db.close()
 
+# 自动下载的并发控制：同一账号访问 M-Team 串行，同一下载器的请求数有上限
+_account_locks: Dict[int, asyncio.Lock] = {}
+_downloader_semaphores: Dict[int, asyncio.Semaphore] = {}
+
+# 各账号已确认有本地下载历史的种子 ID（跨轮次保留的 LRU 集合，有容量上限），写入下载历史时加入。
+# 不在集合中只表示未知，仍需查询数据库；删除下载历史后需调用 forget_seen_torrents
+SEEN_TORRENT_IDS_MAX_SIZE = 5000
+_seen_torrent_ids: Dict[int, "OrderedDict[str, None]"] = {}
+
+# 批量查询下载历史时每次 IN 查询的种子 ID 数量
+HISTORY_LOOKUP_CHUNK_SIZE = 500
+
+# 各规则最近一次执行的统计（搜索耗时、匹配和推送数量），key 为规则 ID
+rule_run_stats: Dict[int, Dict[str, Any]] = {}
+
+
+def _account_lock(account_id: int) -> asyncio.Lock:
+    return _account_locks.setdefault(account_id, asyncio.Lock())
+
+
+def _downloader_semaphore(downloader_id: int) -> asyncio.Semaphore:
+    return _downloader_semaphores.setdefault(
+        downloader_id, asyncio.Semaphore(settings.DOWNLOADER_MAX_CONCURRENT_REQUESTS)
+    )
+
+
+def _mark_seen(account_id: int, torrent_ids) -> None:
+    """记录账号已有下载历史的种子 ID，超过容量时淘汰最久未使用的"""
+    seen = _seen_torrent_ids.setdefault(account_id, OrderedDict())
+    for torrent_id in torrent_ids:
+        seen[torrent_id] = None
+        seen.move_to_end(torrent_id)
+    while len(seen) > SEEN_TORRENT_IDS_MAX_SIZE:
+        seen.popitem(last=False)
+
+
+def forget_seen_torrents(account_id: Optional[int] = None, torrent_ids: Optional[List[str]] = None) -> None:
+    """删除下载历史后调用，使这些种子可以再次被自动下载
+    
+    Args:
+        account_id: 账号 ID，为空时清空所有账号
+        torrent_ids: 种子 ID 列表，为空时清空该账号
+    """
+    if account_id is None:
+        _seen_torrent_ids.clear()
+    elif torrent_ids is None:
+        _seen_torrent_ids.pop(account_id, None)
+    else:
+        seen = _seen_torrent_ids.get(account_id)
+        if seen:
+            for torrent_id in torrent_ids:
+                seen.pop(torrent_id, None)
+
+
+def _load_downloaded_ids(db: Session, account_id: int, torrent_ids: List[str]) -> set:
+    """批量查询候选种子中已有本地下载历史的 ID：先查内存集合，其余按 IN 查询一次数据库"""
+    seen = _seen_torrent_ids.get(account_id, {})
+    downloaded = {tid for tid in torrent_ids if tid in seen}
+    unknown = [tid for tid in torrent_ids if tid not in seen]
+    
+    for i in range(0, len(unknown), HISTORY_LOOKUP_CHUNK_SIZE):
+        chunk = unknown[i:i + HISTORY_LOOKUP_CHUNK_SIZE]
+        rows = db.query(DownloadHistory.torrent_id).filter(
+            DownloadHistory.account_id == account_id,
+            DownloadHistory.torrent_id.in_(chunk)
+        ).all()
+        downloaded.update(row[0] for row in rows)
+    
+    _mark_seen(account_id, downloaded)
+    return downloaded
+
+
+class _SlotLedger:
+    """本轮自动下载中一个下载器的下载槽位账本
+    
+    由下载器快照中的下载中数量初始化，推送前预占槽位、推送失败归还，
+    指向同一下载器的所有规则共享，并发的规则不会超出下载队列限制。
+    获取快照失败时下载中数量未知，本轮有下载队列限制的规则都不推送。
+    """
+    
+    def __init__(self, downloader: Optional[Downloader]):
+        self.downloader = downloader  # 已从会话分离；为 None 表示下载器不存在
+        self.used: Optional[int] = None  # 下载中数量 + 本轮已预占的槽位，未初始化或数量未知为 None
+        self.seeded = False
+        self._lock = asyncio.Lock()
+    
+    async def seed(self) -> None:
+        """读取一次下载器快照（多个规则同时调用只读取一次，失败后本轮不再重试）"""
+        async with self._lock:
+            if not self.seeded:
+                self.seeded = True
+                async with _downloader_semaphore(self.downloader.id):
+                    state = await get_downloader_state(self.downloader)
+                if state is not None:
+                    self.used = state.downloading_count()
+    
+    @property
+    def known(self) -> bool:
+        """下载中数量是否已知"""
+        return self.used is not None
+    
+    def has_slot(self, limit: int) -> bool:
+        return self.used is not None and self.used < limit
+    
+    def reserve(self, limit: int) -> bool:
+        """预占一个槽位，队列已满或下载中数量未知返回 False"""
+        if self.used is None or self.used >= limit:
+            return False
+        self.used += 1
+        return True
+    
+    def release(self) -> None:
+        self.used -= 1
+    
+    def record_push(self) -> None:
+        """没有下载队列限制的规则推送成功后计入（账本已初始化时）"""
+        if self.used is not None:
+            self.used += 1
+
+
+async def _get_slot_ledger(db: Session, ledgers: Dict[int, _SlotLedger], rule: FilterRule) -> _SlotLedger:
+    """获取规则对应下载器的本轮账本，有下载队列限制时确保已初始化"""
+    ledger = ledgers.get(rule.downloader_id)
+    if ledger is None:
+        downloader = db.query(Downloader).filter(Downloader.id == rule.downloader_id).first()
+        if downloader:
+            db.expunge(downloader)
+        ledger = ledgers.setdefault(rule.downloader_id, _SlotLedger(downloader))
+    if rule.max_downloading and ledger.downloader:
+        await ledger.seed()
+    return ledger
+
+
+def _get_rule_crawl_batch(crawl_cache: Dict[str, CrawlBatch], rule: FilterRule) -> CrawlBatch:
+    """登记规则使用的本轮抓取批次（按账号、模式、促销、分类共享）"""
+    # 构建搜索参数
+    discount = None
+    if rule.free_only:
+        discount = "FREE"
+    elif rule.double_upload:
+        discount = "_2X"
+    # 使用规则的模式（normal 或 adult）
+    return get_crawl_batch(crawl_cache, rule.account_id, rule.mode, rule.categories, discount)
+
+
+async def _search_rule_torrents(db: Session, api: MTeamAPI, rule: FilterRule, batch: CrawlBatch):
+    """搜索规则对应的种子，失败返回 None"""
+    print(f"[Scheduler] 规则 '{rule.name}' 开始访问网站搜索种子")
+    # 增量抓取：从第一页翻到上次处理过的种子为止
+    result = await crawl_new_torrents(api, db, batch)
+    
+    if not result["success"]:
+        print(f"[Scheduler] 规则 '{rule.name}' 搜索种子失败")
+        return None
+    
+    torrents = result["torrents"]
+    print(f"[Scheduler] 规则 '{rule.name}' 获取到 {len(torrents)} 个种子")
+    return torrents
+
+
+async def _push_torrent(ledger: _SlotLedger, rule: FilterRule, torrent_path: str) -> Optional[Any]:
+    """推送种子到下载器，有下载队列限制时先在账本中预占槽位，推送失败归还
+    
+    Returns:
+        info_hash（推送失败为 None）；下载队列已满返回 False
+    """
+    reserved = False
+    if rule.max_downloading:
+        if not ledger.reserve(rule.max_downloading):
+            print(f"[Scheduler] 规则 '{rule.name}' 下载队列已满 ({ledger.used}/{rule.max_downloading})，停止处理更多种子")
+            return False
+        reserved = True
+    
+    info_hash = None
+    try:
+        async with _downloader_semaphore(ledger.downloader.id):
+            info_hash = await add_torrent(ledger.downloader, torrent_path, rule.save_path, rule.tags)
+        return info_hash
+    finally:
+        if reserved and not info_hash:
+            ledger.release()
+        elif not reserved and info_hash:
+            ledger.record_push()
+
+
+class _AccountRun:
+    """一个账号在本轮自动下载中各规则共享的数据"""
+    
+    def __init__(self, account_id: int, api: MTeamAPI):
+        self.account_id = account_id
+        self.api = api
+        self.tracker_history: Dict[str, Any] = {}
+        # 本轮候选种子中已有本地下载历史的 ID
+        self.downloaded_ids: set = set()
+        # 本轮已被某个规则处理的种子 ID，避免多个规则同时推送同一个种子
+        self.claimed_ids: set = set()
+
+
+class _RuleRun:
+    """一个规则在本轮自动下载中的状态"""
+    
+    def __init__(
+        self,
+        rule: FilterRule,
+        account_run: _AccountRun,
+        batch: CrawlBatch,
+        ledger: Optional[_SlotLedger],
+        stats: Dict[str, Any]
+    ):
+        self.rule = rule  # 已从会话分离，只读取列属性
+        self.account_run = account_run
+        self.batch = batch
+        self.ledger = ledger  # 规则对应下载器的本轮账本，未关联下载器为 None
+        self.stats = stats
+        self.torrents: list = []
+        self.pushed = 0  # 本次已推送的种子数量
+        self.queue_full = False  # 下载队列已满后丢弃该规则剩余的种子
+    
+    def release(self, torrent) -> None:
+        """种子未能推送，其他规则仍可尝试（未调用 done，下一轮会重新抓取）"""
+        self.account_run.claimed_ids.discard(torrent.id)
+    
+    def done(self, torrent) -> None:
+        """该规则已处理完这个种子，游标可以越过它"""
+        self.batch.mark_done(torrent.id)
+
+
+async def _discover_account_torrents(
+    account_id: int,
+    emit,
+    rule_ids: List[int],
+    crawl_cache: Dict[str, CrawlBatch],
+    ledgers: Dict[int, _SlotLedger]
+) -> None:
+    """搜索阶段：串行搜索账号下各规则的种子，合并查询一次网站下载历史，输出 (规则, 种子)"""
+    db = SessionLocal()
+    try:
+        account = db.query(Account).filter(Account.id == account_id).first()
+        if not account or not account.api_key:
+            return
+        account_name = account.username or account.id
+        rules = db.query(FilterRule).filter(FilterRule.id.in_(rule_ids)).all()
+        
+        account_run = _AccountRun(account_id, MTeamAPI(account.api_key))
+        rule_runs = []
+        for rule in rules:
+            stats = {"name": rule.name, "account_id": account_id, "started_at": beijing_now().isoformat()}
+            rule_run_stats[rule.id] = stats
+            start = time.monotonic()
+            try:
+                # 跳过的规则也要登记，游标不会越过它没有处理的种子
+                batch = _get_rule_crawl_batch(crawl_cache, rule)
+                ledger = None
+                if rule.downloader_id:
+                    ledger = await _get_slot_ledger(db, ledgers, rule)
+                    # 提前检查下载队列限制，避免不必要的网站访问
+                    if rule.max_downloading:
+                        if not ledger.downloader:
+                            print(f"[Scheduler] 规则 '{rule.name}' 关联的下载器不存在，跳过")
+                            stats["skipped"] = "下载器不存在"
+                            continue
+                        if not ledger.known:
+                            print(f"[Scheduler] 规则 '{rule.name}' 无法获取下载器 {ledger.downloader.name} 的下载中数量，跳过")
+                            stats["skipped"] = "下载器状态未知"
+                            continue
+                        if not ledger.has_slot(rule.max_downloading):
+                            print(f"[Scheduler] 规则 '{rule.name}' 下载队列已满 ({ledger.used}/{rule.max_downloading})，跳过网站访问")
+                            stats["skipped"] = "下载队列已满"
+                            continue
+                        print(f"[Scheduler] 规则 '{rule.name}' 下载队列状态: {ledger.used}/{rule.max_downloading}，继续检查种子")
+                async with _account_lock(account_id):
+                    torrents = await _search_rule_torrents(db, account_run.api, rule, batch)
+                if torrents is not None:
+                    stats["searched"] = len(torrents)
+                    rule_run = _RuleRun(rule, account_run, batch, ledger, stats)
+                    rule_run.torrents = torrents
+                    rule_runs.append(rule_run)
+                else:
+                    stats["error"] = "搜索种子失败"
+            except Exception as e:
+                stats["error"] = str(e)
+                print(f"[Scheduler] 处理规则 '{rule.name}' 失败: {e}")
+            finally:
+                stats["search_seconds"] = round(time.monotonic() - start, 3)
+        
+        candidate_ids = list(dict.fromkeys(t.id for r in rule_runs for t in r.torrents))
+        
+        # 所有规则的种子合并查询一次本地下载历史
+        account_run.downloaded_ids = _load_downloaded_ids(db, account_id, candidate_ids)
+        
+        # 其余种子合并查询一次网站下载历史
+        remote_ids = [tid for tid in candidate_ids if tid not in account_run.downloaded_ids]
+        if remote_ids:
+            try:
+                async with _account_lock(account_id):
+                    account_run.tracker_history = await account_run.api.get_tracker_history_map(remote_ids)
+                if account_run.tracker_history:
+                    print(f"[Scheduler] 账号 {account_name}: {len(remote_ids)} 个种子中 {len(account_run.tracker_history)} 个有下载历史")
+            except Exception as e:
+                print(f"[Scheduler] 账号 {account_name} 查询下载历史失败: {e}")
+        
+        # 重新加载规则后从会话分离，供后续阶段读取
+        for rule_run in rule_runs:
+            db.refresh(rule_run.rule)
+        db.expunge_all()
+    finally:
+        db.close()
+    
+    # 会话关闭后再输出，下游阻塞时不占用数据库连接
+    for rule_run in rule_runs:
+        for torrent in rule_run.torrents:
+            await emit((rule_run, torrent))
+        rule_run.torrents = []
+
+
+async def _filter_torrent(item, emit) -> None:
+    """筛选阶段：跳过本地或网站已有下载历史、不匹配规则、已被其他规则处理的种子"""
+    rule_run, torrent = item
+    if rule_run.queue_full:
+        return
+    account_run = rule_run.account_run
+    
+    # 检查是否已在本地下载历史中（搜索阶段已批量查询）
+    if torrent.id in account_run.downloaded_ids:
+        rule_run.done(torrent)
+        return
+    
+    # 检查是否在 M-Team 网站有下载历史（曾经下载过）
+    if torrent.id in account_run.tracker_history:
+        history_info = account_run.tracker_history[torrent.id]
+        print(f"[Scheduler] 跳过已下载过的种子: {torrent.name} (网站记录: 上传={history_info.get('uploaded', 0)}, 下载={history_info.get('download', 0)})")
+        rule_run.done(torrent)
+        return
+    
+    # 检查是否匹配规则
+    if not match_torrent(torrent, rule_run.rule):
+        rule_run.done(torrent)
+        return
+    
+    # 其他规则本轮已处理该种子（那个规则没处理完时游标同样不会越过它）
+    if torrent.id in account_run.claimed_ids:
+        rule_run.done(torrent)
+        return
+    account_run.claimed_ids.add(torrent.id)
+    
+    rule_run.stats["matched"] = rule_run.stats.get("matched", 0) + 1
+    print(f"[Scheduler] 匹配规则 '{rule_run.rule.name}': {torrent.name}")
+    await emit(item)
+
+
+async def _fetch_torrent_file(item, emit) -> None:
+    """获取种子文件阶段：本地已有则直接复用，同一账号访问 M-Team 串行"""
+    rule_run, torrent = item
+    if rule_run.queue_full:
+        rule_run.release(torrent)
+        return
+    account_run = rule_run.account_run
+    
+    db = SessionLocal()
+    try:
+        async with _account_lock(account_run.account_id):
+            fetched = await fetch_torrent(account_run.api, db, account_run.account_id, torrent.id)
+    finally:
+        db.close()
+    if not fetched:
+        print(f"[Scheduler] 下载种子文件失败: {torrent.name}")
+        rule_run.release(torrent)
+        return
+    
+    await emit((rule_run, torrent, str(fetched[2])))
+
+
+async def _push_and_record(item, emit) -> None:
+    """推送阶段：推送到下载器并记录下载历史"""
+    rule_run, torrent, torrent_path = item
+    rule = rule_run.rule
+    if rule_run.queue_full:
+        rule_run.release(torrent)
+        return
+    
+    db = SessionLocal()
+    try:
+        # 推送到下载器
+        status = "downloaded"
+        info_hash = None
+        if rule_run.ledger and rule_run.ledger.downloader:
+            info_hash = await _push_torrent(rule_run.ledger, rule, torrent_path)
+            if info_hash is False:
+                # 下载队列已满，丢弃该规则剩余的种子
+                rule_run.queue_full = True
+                rule_run.release(torrent)
+                return
+            status = "pushing" if info_hash else "push_failed"
+            print(f"[Scheduler] 推送到下载器: {bool(info_hash)}, hash: {info_hash}")
+            
+            if info_hash:
+                rule_run.pushed += 1
+                rule_run.stats["pushed"] = rule_run.pushed
+        
+        # 解析促销到期时间
+        discount_end_time = None
+        if torrent.discount_end_time:
+            try:
+                discount_end_time = parse_discount_end_time(torrent.discount_end_time)
+            except Exception as e:
+                print(f"[Scheduler] 解析促销到期时间失败: {e}")
+        
+        # 记录下载历史
+        history = DownloadHistory(
+            account_id=rule_run.account_run.account_id,
+            torrent_id=torrent.id,
+            torrent_name=torrent.name,
+            torrent_size=torrent.size,
+            rule_id=rule.id,
+            downloader_id=rule.downloader_id,
+            status=status,
+            info_hash=info_hash,
+            discount_type=torrent.discount,
+            discount_end_time=discount_end_time
+        )
+        db.add(history)
+        db.commit()
+        rule_run.done(torrent)
+        _mark_seen(rule_run.account_run.account_id, [torrent.id])
+        schedule_expiry(history)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# 最近一次自动下载的流水线（用于调度器状态页面）
+auto_download_pipeline: Optional[Pipeline] = None
+
+
+def _build_auto_download_pipeline(crawl_cache: Dict[str, CrawlBatch], rules_by_account: Dict[int, List[int]]) -> Pipeline:
+    # 本轮各下载器的槽位账本，key 为 Downloader.id，所有账号和规则共享
+    ledgers: Dict[int, _SlotLedger] = {}
+    
+    async def discover(account_id, emit):
+        await _discover_account_torrents(account_id, emit, rules_by_account[account_id], crawl_cache, ledgers)
+    
+    queue_size = settings.AUTO_DOWNLOAD_QUEUE_SIZE
+    return Pipeline("auto_download", [
+        Stage("discovery", discover, settings.AUTO_DOWNLOAD_DISCOVERY_CONCURRENCY, queue_size),
+        Stage("filter", _filter_torrent, settings.AUTO_DOWNLOAD_FILTER_CONCURRENCY, queue_size),
+        Stage("fetch", _fetch_torrent_file, settings.AUTO_DOWNLOAD_FETCH_CONCURRENCY, queue_size),
+        Stage("push", _push_and_record, settings.AUTO_DOWNLOAD_PUSH_CONCURRENCY, queue_size),
+    ])
+
+
 async def auto_download_torrents():
-    """根据规则自动下载种子"""
+    """根据规则自动下载种子
+    
+    按流水线执行，阶段之间用有界队列连接，各阶段的并发数分别配置：
+    
+    1. 搜索：每个账号串行搜索各规则的种子，再合并查询一次网站下载历史
+    2. 筛选：跳过已下载过、不匹配规则、已被其他规则处理的种子
+    3. 获取种子文件：同一账号访问 M-Team 的请求串行
+    4. 推送：推送到下载器并记录下载历史，同一下载器的并发请求数由 DOWNLOADER_MAX_CONCURRENT_REQUESTS 限制
+    
+    每个下载器本轮只查询一次下载中数量，之后在槽位账本中预占和归还，不再逐个种子重新查询。
+    
+    慢的下载器只会让推送阶段的队列积压，队列满后上游逐步放慢，不会无限堆积。
+    """
+    global auto_download_pipeline
+    
     # 记录执行时间
     last_execution_times["auto_download"] = beijing_now()
     
@@ -186,176 +662,224 @@ async def auto_download_torrents():
     
     db = SessionLocal()
     try:
-        # 获取所有启用的规则
+        # 获取所有启用的规则，按账号分组
         rules = db.query(FilterRule).filter(FilterRule.is_enabled == True).all()
-        
+        rules_by_account: Dict[int, List[int]] = {}
         for rule in rules:
-            account = db.query(Account).filter(Account.id == rule.account_id).first()
-            if not account or not account.api_key:
+            rules_by_account.setdefault(rule.account_id, []).append(rule.id)
+    finally:
+        db.close()
+    
+    if not rules_by_account:
+        return
+    
+    # 本轮抓取结果缓存，搜索条件相同的规则共享一次抓取
+    crawl_cache: Dict[str, CrawlBatch] = {}
+    auto_download_pipeline = _build_auto_download_pipeline(crawl_cache, rules_by_account)
+    await auto_download_pipeline.run(rules_by_account)
+    
+    # 所有种子处理完后再推进抓取游标，未处理完的种子下一轮重新抓取
+    db = SessionLocal()
+    try:
+        commit_crawl_cursors(db, crawl_cache)
+    except Exception as e:
+        db.rollback()
+        print(f"[Scheduler] 更新抓取游标失败: {e}")
+    finally:
+        db.close()
+    
+    print(f"[Scheduler] 自动下载完成，{len(rules)} 个规则耗时 {auto_download_pipeline.last_duration:.1f} 秒")
+
+
+# 过期删种要求的下载器状态新鲜度（秒），避免删除刚刚下载完成的种子
+EXPIRED_CHECK_STATE_MAX_AGE = 5.0
+
+
+async def _expire_downloader_torrents(
+    downloader: Downloader,
+    candidates: List[tuple],
+    rules: Dict[int, FilterRule],
+    auto_delete_config: Dict[str, Any]
+) -> None:
+    """处理同一下载器中需要检查的种子：在内存中判断范围和标签，一次请求删除所有需要删除的种子
+    
+    Args:
+        candidates: [(下载历史记录, 删除原因)]
+        rules: 规则 ID -> 规则
+    """
+    delete_scope = auto_delete_config.get("delete_scope", "all")
+    check_tags = auto_delete_config.get("check_tags", True)
+    
+    # 根据删种范围设置过滤（仅对有规则的种子生效，手动上传的种子没有规则）
+    in_scope = []
+    for record, reason in candidates:
+        rule = rules.get(record.rule_id) if record.rule_id else None
+        rule_mode = rule.mode if rule else None
+        if rule_mode:
+            if delete_scope == "normal" and rule_mode == "adult":
+                print(f"[Scheduler] 跳过成人种子（设置为仅删除正常种子）: {record.torrent_name}")
                 continue
-            
-            # 提前检查下载队列限制，避免不必要的网站访问
-            if rule.downloader_id and rule.max_downloading:
-                downloader = db.query(Downloader).filter(
-                    Downloader.id == rule.downloader_id
-                ).first()
-                
-                if downloader:
-                    try:
-                        current_downloading = await get_downloading_count(downloader)
-                        if current_downloading >= rule.max_downloading:
-                            print(f"[Scheduler] 规则 '{rule.name}' 下载队列已满 ({current_downloading}/{rule.max_downloading})，跳过网站访问")
-                            continue
-                        else:
-                            print(f"[Scheduler] 规则 '{rule.name}' 下载队列状态: {current_downloading}/{rule.max_downloading}，继续检查种子")
-                    except Exception as e:
-                        print(f"[Scheduler] 检查下载器 {downloader.name} 队列状态失败: {e}")
-                        continue
-                else:
-                    print(f"[Scheduler] 规则 '{rule.name}' 关联的下载器不存在，跳过")
-                    continue
-            
-            try:
-                api = MTeamAPI(account.api_key)
-                
-                # 构建搜索参数
-                discount = None
-                if rule.free_only:
-                    discount = "FREE"
-                elif rule.double_upload:
-                    discount = "_2X"
-                
-                print(f"[Scheduler] 规则 '{rule.name}' 开始访问网站搜索种子")
-                result = await api.search_torrents(
-                    page=1,
-                    page_size=50,
-                    mode=rule.mode,  # 使用规则的模式（normal 或 adult）
-                    categories=rule.categories,
-                    discount=discount
-                )
-                
-                if not result["success"]:
-                    print(f"[Scheduler] 规则 '{rule.name}' 搜索种子失败")
-                    continue
-                
-                torrents = [parse_torrent(t) for t in result["data"].get("data", [])]
-                print(f"[Scheduler] 规则 '{rule.name}' 获取到 {len(torrents)} 个种子")
-                
-                # 批量查询这些种子在 M-Team 网站的下载历史
-                tracker_history = {}
-                if torrents:
-                    torrent_ids = [t["id"] for t in torrents]
-                    history_result = await api.query_tracker_history(torrent_ids)
-                    if history_result["success"]:
-                        tracker_history = history_result["data"].get("historyMap", {})
-                        if tracker_history:
-                            print(f"[Scheduler] 规则 '{rule.name}' 查询到 {len(tracker_history)} 个种子有下载历史")
-                
-                # 本次任务已推送的种子数量（用于精确控制下载数量）
-                pushed_count_this_run = 0
-                
-                for torrent in torrents:
-                    # 检查是否已在本地下载历史中
-                    existing = db.query(DownloadHistory).filter(
-                        DownloadHistory.account_id == account.id,
-                        DownloadHistory.torrent_id == torrent["id"]
-                    ).first()
-                    
-                    if existing:
-                        continue
-                    
-                    # 检查是否在 M-Team 网站有下载历史（曾经下载过）
-                    if torrent["id"] in tracker_history:
-                        history_info = tracker_history[torrent["id"]]
-                        # 有下载历史记录，说明曾经下载过，跳过
-                        print(f"[Scheduler] 跳过已下载过的种子: {torrent['name']} (网站记录: 上传={history_info.get('uploaded', 0)}, 下载={history_info.get('download', 0)})")
-                        continue
-                    
-                    # 检查是否匹配规则
-                    if not match_torrent(torrent, rule):
-                        continue
-                    
-                    # 检查下载队列限制（结合下载器实时状态和本次已推送数量）
-                    if rule.downloader_id and rule.max_downloading:
-                        downloader = db.query(Downloader).filter(
-                            Downloader.id == rule.downloader_id
-                        ).first()
-                        
-                        if downloader:
-                            current_downloading = await get_downloading_count(downloader)
-                            # 加上本次已推送的数量，确保不会超过限制
-                            effective_downloading = current_downloading + pushed_count_this_run
-                            if effective_downloading >= rule.max_downloading:
-                                print(f"[Scheduler] 下载队列已满 ({current_downloading}+{pushed_count_this_run}/{rule.max_downloading})，停止处理更多种子")
-                                break  # 跳出种子循环，但继续处理下一个规则
-                    
-                    print(f"[Scheduler] 匹配规则 '{rule.name}': {torrent['name']}")
-                    
-                    # 下载种子文件
-                    torrent_content = await api.download_torrent(torrent["id"])
-                    if not torrent_content:
-                        print(f"[Scheduler] 下载种子文件失败: {torrent['name']}")
-                        continue
-                    
-                    # 保存种子文件
-                    torrent_path = TORRENT_DIR / f"{torrent['id']}.torrent"
-                    torrent_path.write_bytes(torrent_content)
-                    
-                    # 推送到下载器
-                    status = "downloaded"
-                    info_hash = None
-                    if rule.downloader_id:
-                        downloader = db.query(Downloader).filter(
-                            Downloader.id == rule.downloader_id
-                        ).first()
-                        
-                        if downloader:
-                            info_hash = await add_torrent(
-                                downloader,
-                                str(torrent_path),
-                                rule.save_path,
-                                rule.tags  # 传入标签
-                            )
-                            status = "pushing" if info_hash else "push_failed"
-                            print(f"[Scheduler] 推送到下载器: {bool(info_hash)}, hash: {info_hash}")
-                            
-                            # 推送成功，增加本次已推送计数
-                            if info_hash:
-                                pushed_count_this_run += 1
-                    
-                    # 解析促销到期时间
-                    discount_end_time = None
-                    if torrent.get("discount_end_time"):
-                        try:
-                            from datetime import datetime
-                            # 尝试解析时间戳（毫秒）
-                            ts = torrent["discount_end_time"]
-                            if isinstance(ts, (int, float)):
-                                discount_end_time = datetime.fromtimestamp(ts / 1000 if ts > 1e10 else ts)
-                            elif isinstance(ts, str):
-                                discount_end_time = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                        except Exception as e:
-                            print(f"[Scheduler] 解析促销到期时间失败: {e}")
-                    
-                    # 记录下载历史
-                    history = DownloadHistory(
-                        account_id=account.id,
-                        torrent_id=torrent["id"],
-                        torrent_name=torrent["name"],
-                        torrent_size=torrent["size"],
-                        rule_id=rule.id,
-                        downloader_id=rule.downloader_id,
-                        status=status,
-                        info_hash=info_hash,
-                        discount_type=torrent.get("discount"),
-                        discount_end_time=discount_end_time
-                    )
-                    db.add(history)
-                    db.commit()
-                    
-            except Exception as e:
-                print(f"[Scheduler] 处理规则 '{rule.name}' 失败: {e}")
-                
+            elif delete_scope == "adult" and rule_mode == "normal":
+                print(f"[Scheduler] 跳过正常种子（设置为仅删除成人种子）: {record.torrent_name}")
+                continue
+        in_scope.append((record, reason, rule))
+    
+    if not in_scope:
+        return
+    
+    state = await get_downloader_state(downloader, max_age=EXPIRED_CHECK_STATE_MAX_AGE)
+    if state is None:
+        # 无法判断种子是否存在，下次再处理
+        print(f"[Scheduler] 获取下载器 {downloader.name} 状态失败，跳过 {len(in_scope)} 个种子")
+        return
+    
+    doomed = []
+    for record, reason, rule in in_scope:
+        torrent_info = state.get(record.info_hash)
+        
+        if torrent_info is None:
+            # 种子不在快照中：可能刚推送还未添加完成，也可能已被手动删除。
+            # 不标记终态，由 sync_download_status 对账时标记为 deleted
+            print(f"[Scheduler] 下载器中暂未找到种子，跳过: {record.torrent_name}")
+            continue
+        
+        if torrent_info.get("is_completed"):
+            # 已完成，更新状态
+            record.status = "completed"
+            print(f"[Scheduler] 种子已完成: {record.torrent_name}")
+            continue
+        
+        # 检查标签是否匹配（根据设置决定是否检查，仅对有规则的种子生效）
+        rule_tags = set(rule.tags) if rule and rule.tags else set()
+        torrent_tags = set(torrent_info.get("tags", []))
+        if check_tags and rule_tags and not rule_tags.intersection(torrent_tags):
+            # 种子没有规则指定的标签，跳过删除
+            print(f"[Scheduler] 种子标签不匹配规则，跳过删除: {record.torrent_name} (种子标签: {torrent_tags}, 规则标签: {rule_tags})")
+            continue
+        
+        progress = torrent_info.get("progress", 0)
+        mode_info = f"模式: {rule.mode}" if rule else "手动上传"
+        print(f"[Scheduler] 删除种子: {record.torrent_name} (原因: {reason}, {mode_info}, 进度: {progress:.1f}%)")
+        doomed.append(record)
+    
+    if not doomed:
+        return
+    
+    # 一次请求删除所有需要删除的种子（原因：促销过期或非免费）
+    success = await delete_torrents(downloader, [record.info_hash for record in doomed], delete_files=True)
+    if success:
+        for record in doomed:
+            record.status = "expired_deleted"
+        print(f"[Scheduler] 已从下载器 {downloader.name} 删除 {len(doomed)} 个种子")
+    else:
+        print(f"[Scheduler] 从下载器 {downloader.name} 删除 {len(doomed)} 个种子失败")
+
+
+def _load_auto_delete_config(db: Session) -> Dict[str, Any]:
+    """读取自动删种设置"""
+    setting = db.query(SystemSettings).filter(
+        SystemSettings.key == "auto_delete_expired"
+    ).first()
+    
+    # 默认设置
+    auto_delete_config = {
+        "enabled": True,
+        "delete_scope": "all",  # all, normal, adult
+        "check_tags": True
+    }
+    
+    if setting:
+        try:
+            auto_delete_config.update(json.loads(setting.value))
+        except json.JSONDecodeError:
+            print(f"[Scheduler] 解析自动删种设置失败，使用默认配置")
+    
+    return auto_delete_config
+
+
+def _expiry_reason(record: DownloadHistory, now: datetime) -> Optional[str]:
+    """需要删除的原因，不需要删除返回 None（促销在 EXPIRY_TIMER_MARGIN 秒内到期也算过期）"""
+    # 情况1：有促销到期时间且已过期（或即将过期）
+    if record.discount_end_time and record.discount_end_time < now + timedelta(seconds=settings.EXPIRY_TIMER_MARGIN):
+        return "促销已过期" if record.discount_end_time < now else "促销即将过期"
+    
+    # 情况2：促销类型不是免费的（非FREE和_2X_FREE）
+    if record.discount_type and record.discount_type not in FREE_DISCOUNT_TYPES:
+        return f"非免费促销({record.discount_type})"
+    
+    return None
+
+
+async def _expire_records(db: Session, records_to_check: List[tuple], auto_delete_config: Dict[str, Any]) -> None:
+    """按下载器分组处理需要删除的记录，每个下载器读取一次种子信息、删除一次
+    
+    Args:
+        records_to_check: [(下载历史记录, 删除原因)]
+    """
+    # 一次查询所有涉及的下载器和规则
+    downloader_ids = {record.downloader_id for record, _ in records_to_check}
+    downloaders = {
+        d.id: d for d in db.query(Downloader).filter(Downloader.id.in_(downloader_ids)).all()
+    }
+    rule_ids = {record.rule_id for record, _ in records_to_check if record.rule_id}
+    rules = {
+        r.id: r for r in db.query(FilterRule).filter(FilterRule.id.in_(rule_ids)).all()
+    } if rule_ids else {}
+    
+    records_by_downloader: Dict[int, list] = {}
+    for record, reason in records_to_check:
+        records_by_downloader.setdefault(record.downloader_id, []).append((record, reason))
+    
+    for downloader_id, candidates in records_by_downloader.items():
+        downloader = downloaders.get(downloader_id)
+        if not downloader:
+            print(f"[Scheduler] 下载器不存在: {downloader_id}，跳过 {len(candidates)} 个种子")
+            continue
+        
+        try:
+            await _expire_downloader_torrents(downloader, candidates, rules, auto_delete_config)
+        except Exception as e:
+            print(f"[Scheduler] 处理下载器 {downloader.name} 的过期种子失败: {e}")
+
+
+async def expire_history_records(history_ids: List[int]):
+    """促销到期定时器的回调：删除指定下载历史对应的种子"""
+    if not is_task_allowed("expired_check"):
+        print(f"[ExpiryTimer] 过期检查任务在当前时间段被禁用，{len(history_ids)} 个种子留给定期检查处理")
+        return
+    
+    db = SessionLocal()
+    try:
+        auto_delete_config = _load_auto_delete_config(db)
+        if not auto_delete_config.get("enabled", True):
+            return
+        
+        now = beijing_now()
+        records = db.query(DownloadHistory).filter(
+            DownloadHistory.id.in_(history_ids),
+            DownloadHistory.status.in_(IN_FLIGHT_STATUSES),
+            DownloadHistory.info_hash != None,
+            DownloadHistory.downloader_id != None
+        ).all()
+        
+        records_to_check = []
+        for record in records:
+            reason = _expiry_reason(record, now)
+            if reason:
+                records_to_check.append((record, reason))
+            else:
+                # 促销信息已变化（如到期时间延后），重新加入定时器
+                schedule_expiry(record)
+        
+        if not records_to_check:
+            return
+        
+        print(f"[ExpiryTimer] {len(records_to_check)} 个种子促销到期，开始处理")
+        await _expire_records(db, records_to_check, auto_delete_config)
+        db.commit()
+        
+    except Exception as e:
+        print(f"[ExpiryTimer] 处理到期种子失败: {e}")
     finally:
         db.close()
 
@@ -369,6 +893,9 @@ async def check_expired_torrents():
     2. 非免费促销（如50%、无优惠）且未完成的种子
     
     做种中的种子不需要删除，因为已经下载完成，不会产生下载量。
+    
+    到期删种主要由促销到期定时器（services.expiry_timer）按时触发，
+    这个定期任务作为对账兜底，处理定时器遗漏或处理失败的记录。
     """
     # 记录执行时间
     last_execution_times["check_expired"] = beijing_now()
@@ -380,26 +907,7 @@ async def check_expired_torrents():
     
     db = SessionLocal()
     try:
-        # 获取自动删种设置
-        from models import SystemSettings
-        import json
-        
-        setting = db.query(SystemSettings).filter(
-            SystemSettings.key == "auto_delete_expired"
-        ).first()
-        
-        # 默认设置
-        auto_delete_config = {
-            "enabled": True,
-            "delete_scope": "all",  # all, normal, adult
-            "check_tags": True
-        }
-        
-        if setting:
-            try:
-                auto_delete_config.update(json.loads(setting.value))
-            except json.JSONDecodeError:
-                print(f"[Scheduler] 解析自动删种设置失败，使用默认配置")
+        auto_delete_config = _load_auto_delete_config(db)
         
         # 如果禁用了自动删种，直接返回
         if not auto_delete_config.get("enabled", True):
@@ -408,116 +916,32 @@ async def check_expired_torrents():
         
         now = beijing_now()
         
-        # 免费促销类型列表
-        FREE_DISCOUNT_TYPES = ["FREE", "_2X_FREE"]
-        
-        # 只查找"下载中"状态的记录
+        # 只查找"下载中"状态且促销已过期或非免费的记录，条件在 SQL 中判断（使用部分索引 idx_inflight_discount）
         # 下载中的状态包括：downloading, pending, pushing, queued, paused
-        downloading_statuses = ["downloading", "pending", "pushing", "queued", "paused"]
-        
         all_records = db.query(DownloadHistory).filter(
-            DownloadHistory.status.in_(downloading_statuses),
+            DownloadHistory.status.in_(IN_FLIGHT_STATUSES),
+            or_(
+                DownloadHistory.discount_end_time < now + timedelta(seconds=settings.EXPIRY_TIMER_MARGIN),
+                DownloadHistory.discount_type.notin_(FREE_DISCOUNT_TYPES)
+            ),
             DownloadHistory.info_hash != None,
             DownloadHistory.downloader_id != None
         ).all()
         
-        # 筛选需要删除的记录
+        # 确定删除原因
         records_to_check = []
         for record in all_records:
-            should_check = False
-            reason = ""
-            
-            # 情况1：有促销到期时间且已过期
-            if record.discount_end_time and record.discount_end_time < now:
-                should_check = True
-                reason = "促销已过期"
-            
-            # 情况2：促销类型不是免费的（非FREE和_2X_FREE）
-            elif record.discount_type and record.discount_type not in FREE_DISCOUNT_TYPES:
-                should_check = True
-                reason = f"非免费促销({record.discount_type})"
-            
-            if should_check:
+            reason = _expiry_reason(record, now)
+            if reason:
                 records_to_check.append((record, reason))
         
-        print(f"[Scheduler] 检查下载中的非免费/过期种子，找到 {len(records_to_check)} 个需要处理")
-        print(f"[Scheduler] 删种设置: 启用={auto_delete_config['enabled']}, 范围={auto_delete_config['delete_scope']}, 检查标签={auto_delete_config['check_tags']}")
-        
         if not records_to_check:
             return
         
-        for record, reason in records_to_check:
-            # 获取下载器
-            downloader = db.query(Downloader).filter(
-                Downloader.id == record.downloader_id
-            ).first()
-            
-            if not downloader:
-                print(f"[Scheduler] 下载器不存在: {record.torrent_name}")
-                continue
-            
-            # 获取关联的规则（可能为空，手动上传的种子没有规则）
-            rule = None
-            rule_tags = set()
-            rule_mode = None
-            
-            if record.rule_id:
-                rule = db.query(FilterRule).filter(FilterRule.id == record.rule_id).first()
-                if rule:
-                    rule_tags = set(rule.tags) if rule.tags else set()
-                    rule_mode = rule.mode
-            
-            # 根据删种范围设置过滤（仅对有规则的种子生效）
-            delete_scope = auto_delete_config.get("delete_scope", "all")
-            if rule_mode:
-                if delete_scope == "normal" and rule_mode == "adult":
-                    print(f"[Scheduler] 跳过成人种子（设置为仅删除正常种子）: {record.torrent_name}")
-                    continue
-                elif delete_scope == "adult" and rule_mode == "normal":
-                    print(f"[Scheduler] 跳过正常种子（设置为仅删除成人种子）: {record.torrent_name}")
-                    continue
-            
-            try:
-                # 获取种子信息（包含标签）
-                torrent_info = await get_torrent_info_with_tags(downloader, record.info_hash)
-                
-                if torrent_info is None:
-                    # 种子不存在（可能已被手动删除）
-                    record.status = "expired_deleted"
-                    print(f"[Scheduler] 种子已不存在: {record.torrent_name}")
-                    continue
-                
-                if torrent_info.get("is_completed"):
-                    # 已完成，更新状态
-                    record.status = "completed"
-                    print(f"[Scheduler] 种子已完成: {record.torrent_name}")
-                    continue
-                
-                # 检查标签是否匹配（根据设置决定是否检查，仅对有规则的种子生效）
-                torrent_tags = set(torrent_info.get("tags", []))
-                check_tags = auto_delete_config.get("check_tags", True)
-                
-                if check_tags and rule_tags and not rule_tags.intersection(torrent_tags):
-                    # 种子没有规则指定的标签，跳过删除
-                    print(f"[Scheduler] 种子标签不匹配规则，跳过删除: {record.torrent_name} (种子标签: {torrent_tags}, 规则标签: {rule_tags})")
-                    continue
-                
-                # 删除种子（原因：促销过期或非免费）
-                progress = torrent_info.get("progress", 0)
-                mode_info = f"模式: {rule_mode}" if rule_mode else "手动上传"
-                print(f"[Scheduler] 删除种子: {record.torrent_name} (原因: {reason}, {mode_info}, 进度: {progress:.1f}%)")
-                
-                success = await delete_torrent(downloader, record.info_hash, delete_files=True)
-                
-                if success:
-                    record.status = "expired_deleted"
-                    print(f"[Scheduler] 已删除种子: {record.torrent_name}")
-                else:
-                    print(f"[Scheduler] 删除种子失败: {record.torrent_name}")
-                    
-            except Exception as e:
-                print(f"[Scheduler] 处理过期种子失败 {record.torrent_name}: {e}")
+        print(f"[Scheduler] 检查下载中的非免费/过期种子，找到 {len(records_to_check)} 个需要处理")
+        print(f"[Scheduler] 删种设置: 启用={auto_delete_config['enabled']}, 范围={auto_delete_config['delete_scope']}, 检查标签={auto_delete_config['check_tags']}")
         
+        await _expire_records(db, records_to_check, auto_delete_config)
         db.commit()
         
     except Exception as e:
@@ -583,13 +1007,13 @@ async def check_dynamic_delete():
         try:
             print(f"[DynamicDelete] 检查下载器: {downloader.name}")
             
-            # 获取磁盘空间信息
-            disk_info = await get_disk_space_info(downloader)
-            if not disk_info or "free_space_gb" not in disk_info:
+            # 从下载器共享状态获取剩余空间和种子列表
+            state = await get_downloader_state(downloader)
+            if state is None:
                 print(f"[DynamicDelete] 无法获取下载器 {downloader.name} 的磁盘空间信息")
                 return
             
-            free_space_gb = disk_info["free_space_gb"]
+            free_space_gb = state.free_space_gb
             max_capacity_gb = auto_delete_config["max_capacity_gb"]
             min_capacity_gb = auto_delete_config["min_capacity_gb"]
             
@@ -607,8 +1031,8 @@ async def check_dynamic_delete():
             need_to_free_gb = min_capacity_gb - free_space_gb
             print(f"[DynamicDelete] 需要释放空间: {need_to_free_gb:.2f} GB")
             
-            # 获取所有种子详细信息
-            all_torrents = await get_all_torrents_with_details(downloader)
+            # 所有种子详细信息
+            all_torrents = list(state.torrents.values())
             if not all_torrents:
                 print(f"[DynamicDelete] 下载器 {downloader.name} 没有种子")
                 return
@@ -700,14 +1124,25 @@ async def sync_download_status():
             return
         
         updated_count = 0
+        downloaders = {}
+        downloader_states = {}
         
         for record in records:
-            downloader = db.query(Downloader).filter(Downloader.id == record.downloader_id).first()
+            if record.downloader_id not in downloaders:
+                downloaders[record.downloader_id] = db.query(Downloader).filter(Downloader.id == record.downloader_id).first()
+            downloader = downloaders[record.downloader_id]
             if not downloader:
                 continue
                 
             try:
-                torrent_info = await get_torrent_info_with_tags(downloader, record.info_hash)
+                # 每个下载器只读取一次共享状态，获取失败时跳过，避免误标记为已删除
+                if downloader.id not in downloader_states:
+                    downloader_states[downloader.id] = await get_downloader_state(downloader)
+                state = downloader_states[downloader.id]
+                if state is None:
+                    continue
+                
+                torrent_info = state.get(record.info_hash)
                 
                 if torrent_info is None:
                     # 种子不存在，可能已被删除
@@ -762,6 +1197,55 @@ async def sync_download_status():
         db.close()
 
 
+async def refresh_all_downloader_states():
+    """后台轮询所有启用的下载器，刷新共享状态"""
+    # 记录执行时间
+    last_execution_times["downloader_state"] = beijing_now()
+    
+    db = SessionLocal()
+    try:
+        downloaders = db.query(Downloader).filter(Downloader.is_active == True).all()
+    finally:
+        db.close()
+    
+    if downloaders:
+        await refresh_downloader_states(downloaders)
+
+
+async def cleanup_torrent_store():
+    """清理不再需要的种子文件"""
+    # 记录执行时间
+    last_execution_times["torrent_store_gc"] = beijing_now()
+    
+    db = SessionLocal()
+    try:
+        gc_torrent_store(db)
+    except Exception as e:
+        print(f"[Scheduler] 清理种子文件失败: {e}")
+    finally:
+        db.close()
+
+
+def _rebuild_expiry_timer():
+    """从数据库重建促销到期定时器"""
+    db = SessionLocal()
+    try:
+        records = db.query(DownloadHistory).filter(
+            DownloadHistory.status.in_(IN_FLIGHT_STATUSES),
+            or_(
+                DownloadHistory.discount_end_time != None,
+                DownloadHistory.discount_type.notin_(FREE_DISCOUNT_TYPES)
+            ),
+            DownloadHistory.info_hash != None,
+            DownloadHistory.downloader_id != None
+        ).all()
+        start_expiry_timer(expire_history_records, records)
+    except Exception as e:
+        print(f"[Scheduler] 启动促销到期定时器失败: {e}")
+    finally:
+        db.close()
+
+
 def start_scheduler():
     """启动定时任务"""
     intervals = get_refresh_intervals()
@@ -782,7 +1266,7 @@ def start_scheduler():
         replace_existing=True
     )
     
-    # 过期种子检查任务
+    # 过期种子检查任务（促销到期由定时器按时处理，这里定期对账兜底）
     scheduler.add_job(
         check_expired_torrents,
         IntervalTrigger(seconds=intervals["expired_check_interval"]),
@@ -806,17 +1290,36 @@ def start_scheduler():
         replace_existing=True
     )
     
+    # 下载器状态轮询任务
+    scheduler.add_job(
+        refresh_all_downloader_states,
+        IntervalTrigger(seconds=settings.DOWNLOADER_STATE_REFRESH_INTERVAL),
+        id="downloader_state",
+        replace_existing=True
+    )
+    
+    # 种子文件清理任务（每天执行一次）
+    scheduler.add_job(
+        cleanup_torrent_store,
+        IntervalTrigger(seconds=86400),  # 24小时
+        id="torrent_store_gc",
+        replace_existing=True
+    )
+    
     scheduler.start()
+    _rebuild_expiry_timer()
     print(f"[Scheduler] 定时任务已启动")
     print(f"[Scheduler] 账号刷新间隔: {intervals['account_refresh_interval']}秒")
     print(f"[Scheduler] 种子检查间隔: {intervals['torrent_check_interval']}秒")
     print(f"[Scheduler] 过期检查间隔: {intervals['expired_check_interval']}秒")
     print(f"[Scheduler] 状态同步间隔: 60秒")
+    print(f"[Scheduler] 下载器状态刷新间隔: {settings.DOWNLOADER_STATE_REFRESH_INTERVAL}秒")
 
 
 def stop_scheduler():
     """停止定时任务"""
     scheduler.shutdown()
+    stop_expiry_timer()
     print("[Scheduler] 定时任务已停止")
 
 
@@ -862,7 +1365,12 @@ def get_scheduler_status() -> Dict[str, Any]:
             "schedule_control": {
                 "enabled": False,
                 "current_status": {}
-            }
+            },
+            "circuit_breakers": get_circuit_breaker_stats(),
+            "downloader_states": get_downloader_state_stats(),
+            "expiry_timer": get_expiry_timer_stats(),
+            "rule_timings": list(rule_run_stats.values()),
+            "auto_download_pipeline": auto_download_pipeline.stats() if auto_download_pipeline else None
         }
     
     jobs = []
@@ -902,7 +1410,12 @@ def get_scheduler_status() -> Dict[str, Any]:
             "enabled": schedule_control.get("enabled", False),
             "current_status": current_status,
             "time_ranges": schedule_control.get("time_ranges", [])
-        }
+        },
+        "circuit_breakers": get_circuit_breaker_stats(),
+        "downloader_states": get_downloader_state_stats(),
+        "expiry_timer": get_expiry_timer_stats(),
+        "rule_timings": list(rule_run_stats.values()),
+        "auto_download_pipeline": auto_download_pipeline.stats() if auto_download_pipeline else None
     }
 
 
@@ -1,6 +1,86 @@
+import copy
 import httpx
+import json
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 from config import settings
+from models import BEIJING_TZ, beijing_now
+from utils.cache import cache
+from utils.rate_limiter import get_rate_limiter, parse_retry_after, api_key_fingerprint
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker, probe_url
+from utils.singleflight import SingleFlight
+
+# 可以合并并发相同请求的只读接口
+COALESCED_ENDPOINTS = frozenset({
+    "member/profile",
+    "torrent/search",
+    "torrent/detail",
+    "torrent/categoryList",
+    "torrent/sourceList",
+    "torrent/mediumList",
+    "torrent/standardList",
+    "torrent/videoCodecList",
+    "torrent/audioCodecList",
+    "torrent/teamList",
+    "torrent/processingList",
+})
+
+# 进行中的请求登记表，key 为 (api_key, endpoint, payload, use_form)
+_inflight_requests = SingleFlight()
+
+# 种子详情缓存时间（秒）：无促销时使用默认值，有促销时缓存到促销结束，但不超过上限
+DETAIL_CACHE_DEFAULT_TTL = 120
+DETAIL_CACHE_MAX_TTL = 3600
+
+# 被 429 限流时的最大重试次数
+RATE_LIMIT_RETRIES = 2
+
+# 下载历史批量查询时每次请求的种子数量
+TRACKER_HISTORY_CHUNK_SIZE = 100
+# 已确认有下载历史的种子缓存时间（秒），这些种子在有效期内不再重复查询
+TRACKER_HISTORY_CACHE_TTL = 1800
+
+# 进程级共享的 HTTP 客户端（连接池 + Keep-Alive），避免每次请求都重新握手
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    """检查是否安装了 HTTP/2 支持（h2 包）"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享的 HTTP 客户端
+    
+    所有账号共用同一个连接池，认证信息通过请求头区分。
+    首次调用时创建，应用关闭时由 close_http_client 释放。
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.MTEAM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MTEAM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.MTEAM_HTTP_KEEPALIVE_EXPIRY
+            ),
+            http2=settings.MTEAM_HTTP2 and _http2_available()
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """关闭共享的 HTTP 客户端（应用关闭时调用）"""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+        print("[MTeamAPI] HTTP 连接池已关闭")
+    _http_client = None
+
 
 class MTeamAPI:
     """M-Team API 客户端，使用 API Token 认证"""
@@ -14,55 +94,118 @@ class MTeamAPI:
             "Content-Type": "application/json"
         }
     
+    def _breaker(self) -> CircuitBreaker:
+        """该 API Key 的熔断器，熔断期间在后台探测 M-Team 是否恢复"""
+        fingerprint = api_key_fingerprint(self.api_key)
+        return get_circuit_breaker(
+            f"mteam:{fingerprint}",
+            name=f"M-Team {fingerprint}",
+            probe=lambda: probe_url(settings.MTEAM_BASE_URL)
+        )
+    
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """通过共享连接池发送请求
+        
+        请求前先检查熔断器（M-Team 不可用时直接抛出 CircuitOpenError），
+        再从该 API Key 的限流器获取令牌（不足时排队等待），
+        遇到 429 或 5xx 时通知限流器降速，429 会在退避后重新排队重试。
+        连接失败、超时和 5xx 计入熔断器的失败次数。
+        """
+        breaker = self._breaker()
+        breaker.check()
+        limiter = get_rate_limiter(self.api_key)
+        
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await limiter.acquire()
+            try:
+                response = await get_http_client().request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                breaker.record_failure(e.__class__.__name__)
+                raise
+            if response.status_code == 429 or response.status_code >= 500:
+                limiter.on_throttle(parse_retry_after(response.headers.get("Retry-After")))
+            if response.status_code != 429:
+                break
+        
+        if response.status_code >= 500:
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success()
+        return response
+    
+    def _feedback(self, result: dict) -> None:
+        """根据 API 返回的 code 调整限流器速率"""
+        limiter = get_rate_limiter(self.api_key)
+        if result.get("code") == "0":
+            limiter.on_success()
+        else:
+            limiter.on_api_error(result.get("message"))
+    
     async def _request(self, endpoint: str, data: dict = None, use_form: bool = False) -> Dict[str, Any]:
         """发送 API 请求
         
-        注意：M-Team API 要求用 data 参数传 JSON 字符串，而不是用 json 参数
+        只读接口（见 COALESCED_ENDPOINTS）的并发相同请求会合并为一次上游调用，
+        每个调用方拿到结果的独立副本，可以随意修改。
         """
-        import json
         if data is None:
             data = {}
         
+        if endpoint not in COALESCED_ENDPOINTS:
+            return await self._do_request(endpoint, data, use_form)
+        
+        key = (self.api_key, endpoint, json.dumps(data, sort_keys=True, ensure_ascii=False), use_form)
+        result = await _inflight_requests.do(key, lambda: self._do_request(endpoint, data, use_form))
+        return copy.deepcopy(result)
+    
+    async def _do_request(self, endpoint: str, data: dict, use_form: bool) -> Dict[str, Any]:
+        """实际发送 API 请求
+        
+        注意：M-Team API 要求用 data 参数传 JSON 字符串，而不是用 json 参数
+        """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if use_form:
-                    headers = {**self.headers, "Content-Type": "application/x-www-form-urlencoded"}
-                    response = await client.post(
-                        f"{self.base_url}/{endpoint}",
-                        headers=headers,
-                        data=data
-                    )
-                else:
-                    # M-Team API 要求用 data 传 JSON 字符串
-                    headers = {**self.headers}
-                    headers.pop("Content-Type", None)  # 让 httpx 自动处理
-                    response = await client.post(
-                        f"{self.base_url}/{endpoint}",
-                        headers=headers,
-                        content=json.dumps(data)
-                    )
-                
-                # 检查 HTTP 状态码
-                if response.status_code != 200:
-                    return {"success": False, "error": f"HTTP错误: {response.status_code}"}
-                
-                # 检查响应内容是否为空
-                if not response.content:
-                    return {"success": False, "error": "API返回空响应"}
-                
-                # 尝试解析 JSON
-                try:
-                    result = response.json()
-                except json.JSONDecodeError:
-                    # 返回原始响应内容的前200字符用于调试
-                    content_preview = response.text[:200] if response.text else "(空)"
-                    return {"success": False, "error": f"API返回非JSON响应: {content_preview}"}
+            if use_form:
+                headers = {**self.headers, "Content-Type": "application/x-www-form-urlencoded"}
+                response = await self._send(
+                    "POST",
+                    f"{self.base_url}/{endpoint}",
+                    headers=headers,
+                    data=data
+                )
+            else:
+                # M-Team API 要求用 data 传 JSON 字符串
+                headers = {**self.headers}
+                headers.pop("Content-Type", None)  # 让 httpx 自动处理
+                response = await self._send(
+                    "POST",
+                    f"{self.base_url}/{endpoint}",
+                    headers=headers,
+                    content=json.dumps(data)
+                )
+            
+            # 检查 HTTP 状态码
+            if response.status_code != 200:
+                return {"success": False, "error": f"HTTP错误: {response.status_code}"}
+            
+            # 检查响应内容是否为空
+            if not response.content:
+                return {"success": False, "error": "API返回空响应"}
+            
+            # 尝试解析 JSON
+            try:
+                result = response.json()
+            except json.JSONDecodeError:
+                # 返回原始响应内容的前200字符用于调试
+                content_preview = response.text[:200] if response.text else "(空)"
+                return {"success": False, "error": f"API返回非JSON响应: {content_preview}"}
+            
+            self._feedback(result)
+            if result.get("code") == "0":
+                return {"success": True, "data": result.get("data")}
+            else:
+                return {"success": False, "error": result.get("message", "API请求失败")}
                 
-                if result.get("code") == "0":
-                    return {"success": True, "data": result.get("data")}
-                else:
-                    return {"success": False, "error": result.get("message", "API请求失败")}
-                    
+        except CircuitOpenError as e:
+            return {"success": False, "error": str(e)}
         except httpx.TimeoutException:
             return {"success": False, "error": "请求超时，请检查网络连接"}
         except httpx.ConnectError:
@@ -105,9 +248,22 @@ class MTeamAPI:
         
         return await self._request("torrent/search", data)
     
-    async def get_torrent_detail(self, torrent_id: str) -> Dict[str, Any]:
-        """获取种子详情"""
-        return await self._request("torrent/detail", {"id": torrent_id}, use_form=True)
+    async def get_torrent_detail(self, torrent_id: str, use_cache: bool = True) -> Dict[str, Any]:
+        """获取种子详情
+        
+        成功的结果按账号和种子 ID 缓存，缓存时间由促销到期时间决定（见 detail_cache_ttl），
+        缓存中保存的是副本，返回给调用方的也是副本
+        """
+        cache_key = f"torrent_detail:{api_key_fingerprint(self.api_key)}:{torrent_id}"
+        if use_cache:
+            cached_result = cache.get(cache_key)
+            if cached_result is not None:
+                return copy.deepcopy(cached_result)
+        
+        result = await self._request("torrent/detail", {"id": torrent_id}, use_form=True)
+        if result["success"]:
+            cache.set(cache_key, copy.deepcopy(result), detail_cache_ttl(result["data"]))
+        return result
     
     async def gen_download_token(self, torrent_id: str) -> Dict[str, Any]:
         """生成种子下载链接"""
@@ -120,10 +276,9 @@ class MTeamAPI:
             return None
         
         download_url = result["data"]
-        async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-            response = await client.get(download_url)
-            if response.status_code == 200:
-                return response.content
+        response = await self._send("GET", download_url, follow_redirects=True)
+        if response.status_code == 200:
+            return response.content
         return None
     
     async def get_categories(self) -> Dict[str, Any]:
@@ -183,29 +338,58 @@ class MTeamAPI:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/tracker/queryHistory",
-                    headers={
-                        "x-api-key": self.api_key,
-                        "accept": "application/json, text/plain, */*",
-                        "content-type": "application/json",
-                    },
-                    json=payload
-                )
-                
-                if response.status_code != 200:
-                    return {"success": False, "error": f"HTTP错误: {response.status_code}"}
+            response = await self._send(
+                "POST",
+                f"{self.base_url}/tracker/queryHistory",
+                headers={
+                    "x-api-key": self.api_key,
+                    "accept": "application/json, text/plain, */*",
+                    "content-type": "application/json",
+                },
+                json=payload
+            )
+            
+            if response.status_code != 200:
+                return {"success": False, "error": f"HTTP错误: {response.status_code}"}
+            
+            result = response.json()
+            self._feedback(result)
+            if result.get("code") == "0":
+                return {"success": True, "data": result.get("data", {})}
+            else:
+                return {"success": False, "error": result.get("message", "查询失败")}
                 
-                result = response.json()
-                if result.get("code") == "0":
-                    return {"success": True, "data": result.get("data", {})}
-                else:
-                    return {"success": False, "error": result.get("message", "查询失败")}
-                    
         except Exception as e:
             return {"success": False, "error": f"请求异常: {str(e)}"}
 
+    async def get_tracker_history_map(self, torrent_ids: List[str]) -> Dict[str, Any]:
+        """批量查询下载历史，返回有下载历史的种子 {种子ID: 历史信息}
+        
+        种子 ID 去重后分批查询，已确认有历史的种子直接从缓存返回。
+        某一批查询失败时只记录日志，该批种子视为没有下载历史。
+        """
+        history_map: Dict[str, Any] = {}
+        unknown_ids = []
+        for torrent_id in dict.fromkeys(str(t) for t in torrent_ids):
+            cached = cache.get(f"tracker_history:{self.api_key}:{torrent_id}")
+            if cached is not None:
+                history_map[torrent_id] = cached
+            else:
+                unknown_ids.append(torrent_id)
+        
+        for i in range(0, len(unknown_ids), TRACKER_HISTORY_CHUNK_SIZE):
+            chunk = unknown_ids[i:i + TRACKER_HISTORY_CHUNK_SIZE]
+            result = await self.query_tracker_history(chunk)
+            if not result["success"]:
+                print(f"[MTeamAPI] 查询下载历史失败（{len(chunk)} 个种子）: {result.get('error')}")
+                continue
+            for torrent_id, info in ((result["data"] or {}).get("historyMap") or {}).items():
+                torrent_id = str(torrent_id)
+                history_map[torrent_id] = info
+                cache.set(f"tracker_history:{self.api_key}:{torrent_id}", info, TRACKER_HISTORY_CACHE_TTL)
+        
+        return history_map
+
 
 # 折扣类型映射
 DISCOUNT_MAP = {
@@ -217,37 +401,141 @@ DISCOUNT_MAP = {
     "NORMAL": "无优惠"
 }
 
-def parse_torrent(torrent: dict) -> dict:
-    """解析种子数据为统一格式"""
-    status = torrent.get("status", {})
+def parse_discount_end_time(raw: Any) -> Optional[datetime]:
+    """解析促销到期时间为北京时间（不带时区）
+    
+    支持毫秒/秒时间戳和 ISO 格式字符串（如 "2024-01-01 12:00:00"）
+    """
+    if not raw:
+        return None
+    
+    if isinstance(raw, (int, float)):
+        return datetime.fromtimestamp(raw / 1000 if raw > 1e10 else raw, BEIJING_TZ).replace(tzinfo=None)
+    
+    if isinstance(raw, str):
+        if raw.isdigit():
+            return parse_discount_end_time(int(raw))
+        value = datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        if value.tzinfo is not None:
+            value = value.astimezone(BEIJING_TZ).replace(tzinfo=None)
+        return value
+    
+    return None
+
+def detail_cache_ttl(detail: dict) -> int:
+    """根据促销信息计算种子详情的缓存时间
+    
+    有促销时缓存到促销结束（促销结束后折扣会变化），无促销时使用较短的默认值
+    """
+    status = (detail or {}).get("status") or {}
     discount = status.get("discount", "NORMAL")
+    if not discount or discount == "NORMAL":
+        return DETAIL_CACHE_DEFAULT_TTL
     
-    # 解析促销到期时间
-    discount_end_time = status.get("discountEndTime")
+    try:
+        end_time = parse_discount_end_time(status.get("discountEndTime"))
+    except (ValueError, OverflowError):
+        end_time = None
     
-    return {
-        "id": torrent.get("id"),
-        "name": torrent.get("name"),
-        "small_descr": torrent.get("smallDescr"),
-        "category": torrent.get("category"),
-        "size": int(torrent.get("size", 0)),
-        "size_gb": round(int(torrent.get("size", 0)) / (1024**3), 2),
-        "seeders": int(status.get("seeders", 0)),
-        "leechers": int(status.get("leechers", 0)),
-        "completed": int(status.get("timesCompleted", 0)),
-        "discount": discount,
-        "discount_text": DISCOUNT_MAP.get(discount, discount),
-        "discount_end_time": discount_end_time,  # 促销到期时间（ISO格式字符串或时间戳）
-        "is_free": discount in ["FREE", "_2X_FREE"],
-        "is_2x": discount in ["_2X", "_2X_FREE", "_2X_PERCENT_50"],
-        "created_date": torrent.get("createdDate"),
-        "imdb": torrent.get("imdb"),
-        "imdb_rating": torrent.get("imdbRating"),
-        "douban": torrent.get("douban"),
-        "douban_rating": torrent.get("doubanRating"),
-        "labels": torrent.get("labelsNew", []),
-        "images": torrent.get("imageList", [])
-    }
+    if end_time is None:
+        return DETAIL_CACHE_DEFAULT_TTL
+    
+    remaining = int((end_time - beijing_now()).total_seconds())
+    if remaining <= 0:
+        return DETAIL_CACHE_DEFAULT_TTL
+    return min(remaining, DETAIL_CACHE_MAX_TTL)
+
+class TorrentRecord:
+    """种子记录（紧凑结构）
+    
+    使用 __slots__ 存储原始字段，size_gb、is_free 等派生字段按需计算。
+    兼容字典式访问（torrent["id"]、torrent.get("name")），便于旧代码继续使用。
+    """
+    
+    __slots__ = (
+        "id", "name", "small_descr", "category", "size",
+        "seeders", "leechers", "completed",
+        "discount", "discount_end_time", "created_date",
+        "imdb", "imdb_rating", "douban", "douban_rating",
+        "labels", "images"
+    )
+    
+    # 派生字段（to_dict 时输出）
+    DERIVED_FIELDS = ("size_gb", "discount_text", "is_free", "is_2x")
+    
+    @classmethod
+    def from_api(cls, torrent: dict, lean: bool = False) -> "TorrentRecord":
+        """从 API 返回的种子数据构建记录
+        
+        Args:
+            lean: 精简模式，不保留评分、标签、图片等展示字段（自动下载只需要匹配相关字段）
+        """
+        status = torrent.get("status") or {}
+        
+        record = cls.__new__(cls)
+        record.id = torrent.get("id")
+        record.name = torrent.get("name")
+        record.small_descr = torrent.get("smallDescr")
+        record.category = torrent.get("category")
+        record.size = int(torrent.get("size") or 0)
+        record.seeders = int(status.get("seeders") or 0)
+        record.leechers = int(status.get("leechers") or 0)
+        record.completed = int(status.get("timesCompleted") or 0)
+        record.discount = status.get("discount", "NORMAL")
+        record.discount_end_time = status.get("discountEndTime")  # 促销到期时间（ISO格式字符串或时间戳）
+        record.created_date = torrent.get("createdDate")
+        
+        if lean:
+            record.imdb = record.imdb_rating = record.douban = record.douban_rating = None
+            record.labels = record.images = ()
+        else:
+            record.imdb = torrent.get("imdb")
+            record.imdb_rating = torrent.get("imdbRating")
+            record.douban = torrent.get("douban")
+            record.douban_rating = torrent.get("doubanRating")
+            record.labels = torrent.get("labelsNew") or []
+            record.images = torrent.get("imageList") or []
+        
+        return record
+    
+    @property
+    def size_gb(self) -> float:
+        return round(self.size / (1024**3), 2)
+    
+    @property
+    def discount_text(self) -> str:
+        return DISCOUNT_MAP.get(self.discount, self.discount)
+    
+    @property
+    def is_free(self) -> bool:
+        return self.discount in ("FREE", "_2X_FREE")
+    
+    @property
+    def is_2x(self) -> bool:
+        return self.discount in ("_2X", "_2X_FREE", "_2X_PERCENT_50")
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+    
+    def to_dict(self) -> dict:
+        """转换为字典（与旧版 parse_torrent 的输出一致）"""
+        data = {field: getattr(self, field) for field in self.__slots__}
+        for field in self.DERIVED_FIELDS:
+            data[field] = getattr(self, field)
+        return data
+    
+    def __repr__(self) -> str:
+        return f"<TorrentRecord {self.id} {self.name!r}>"
+
+def parse_torrent(torrent: dict, lean: bool = False) -> TorrentRecord:
+    """解析种子数据为统一格式"""
+    return TorrentRecord.from_api(torrent, lean)
 
 def parse_user_profile(data: dict) -> dict:
     """解析用户信息"""
@@ -0,0 +1,225 @@
+"""
+种子文件存储
+种子文件按 info_hash 存放在 TORRENT_DIR/blobs/<所属>/<hash前2位>/<hash>.torrent，
+并在 torrent_files 表中记录 种子ID -> info_hash 的索引，重复下载和推送直接读取本地文件。
+
+注意：M-Team 的种子文件中 announce 地址带有账号的 passkey，
+不同账号的同一个种子 info_hash 相同但文件内容不同，因此按账号分目录存放。
+"""
+
+import hashlib
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Any, List
+
+from sqlalchemy.orm import Session
+
+from config import TORRENT_DIR, settings
+from models import TorrentFile, DownloadHistory, beijing_now
+from utils.bencode import compute_info_hash
+
+BLOB_DIR = TORRENT_DIR / "blobs"
+
+# 下载历史的终态：这些状态的种子已不在下载器中，不再需要种子文件
+# （deleted 不算：种子重新出现在下载器中时 sync_download_status 会恢复状态）
+TERMINAL_STATUSES = ["expired_deleted", "dynamic_deleted", "failed", "push_failed"]
+
+
+def _owner_dir(account_id: Optional[int]) -> str:
+    """种子文件所属目录名"""
+    return f"account_{account_id}" if account_id else "upload"
+
+
+def blob_path(info_hash: str, account_id: Optional[int] = None) -> Path:
+    """种子文件的存储路径"""
+    return BLOB_DIR / _owner_dir(account_id) / info_hash[:2] / f"{info_hash}.torrent"
+
+
+def save_torrent(
+    db: Session,
+    content: bytes,
+    account_id: Optional[int] = None,
+    torrent_id: Optional[str] = None
+) -> Tuple[str, Path, bool]:
+    """保存种子文件并更新索引（只 flush，由调用方提交）
+
+    Returns:
+        (info_hash, 文件路径, 是否新写入了文件)
+    """
+    info_hash = compute_info_hash(content)
+    if not info_hash:
+        # 无法解析的文件按内容哈希保存，保证仍然可以复用
+        info_hash = hashlib.sha1(content).hexdigest()
+        print(f"[TorrentStore] 无法解析种子文件 info_hash，使用内容哈希: {info_hash}")
+
+    path = blob_path(info_hash, account_id)
+    created = not path.exists()
+    if created:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再重命名，避免并发读到不完整的文件
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_bytes(content)
+        os.replace(tmp_path, path)
+
+    if torrent_id:
+        entry = db.query(TorrentFile).filter(
+            TorrentFile.account_id == account_id,
+            TorrentFile.torrent_id == torrent_id
+        ).first()
+    else:
+        entry = db.query(TorrentFile).filter(
+            TorrentFile.account_id == account_id,
+            TorrentFile.info_hash == info_hash
+        ).first()
+
+    if not entry:
+        entry = TorrentFile(account_id=account_id, torrent_id=torrent_id)
+        db.add(entry)
+    entry.info_hash = info_hash
+    entry.size = len(content)
+    db.flush()
+
+    return info_hash, path, created
+
+
+def load_torrent(db: Session, account_id: Optional[int], torrent_id: str) -> Optional[Tuple[bytes, str, Path]]:
+    """从本地读取已保存的种子文件
+
+    Returns:
+        (文件内容, info_hash, 文件路径)，不存在返回 None
+    """
+    entry = db.query(TorrentFile).filter(
+        TorrentFile.account_id == account_id,
+        TorrentFile.torrent_id == torrent_id
+    ).first()
+    if not entry:
+        return None
+
+    path = blob_path(entry.info_hash, account_id)
+    if not path.exists():
+        return None
+
+    return path.read_bytes(), entry.info_hash, path
+
+
+async def fetch_torrent(api, db: Session, account_id: int, torrent_id: str) -> Optional[Tuple[bytes, str, Path]]:
+    """获取种子文件：优先使用本地文件，不存在时从 M-Team 下载并保存
+
+    Returns:
+        (文件内容, info_hash, 文件路径)，下载失败返回 None
+    """
+    local = load_torrent(db, account_id, torrent_id)
+    if local:
+        return local
+
+    content = await api.download_torrent(torrent_id)
+    if not content:
+        return None
+
+    info_hash, path, _ = save_torrent(db, content, account_id, torrent_id)
+    db.commit()
+    return content, info_hash, path
+
+
+def _history_state(db: Session, hashes: List[str], per_account: bool = True) -> Dict[Any, Dict[str, Any]]:
+    """批量查询下载历史：(account_id, info_hash) 或 info_hash -> {是否有未结束的记录, 最近结束时间}
+
+    结束时间取记录的最后更新时间（终态记录不再更新），旧记录没有更新时间时用创建时间。
+    """
+    history_state: Dict[Any, Dict[str, Any]] = {}
+    for i in range(0, len(hashes), 500):
+        rows = db.query(
+            DownloadHistory.account_id, DownloadHistory.info_hash, DownloadHistory.status,
+            DownloadHistory.created_at, DownloadHistory.updated_at
+        ).filter(DownloadHistory.info_hash.in_(hashes[i:i + 500])).all()
+        for account_id, info_hash, status, created_at, updated_at in rows:
+            key = (account_id, info_hash) if per_account else info_hash
+            state = history_state.setdefault(key, {"active": False, "latest": None})
+            if status not in TERMINAL_STATUSES:
+                state["active"] = True
+            ended_at = updated_at or created_at
+            if ended_at and (state["latest"] is None or ended_at > state["latest"]):
+                state["latest"] = ended_at
+    return history_state
+
+
+def _is_expired(state: Optional[Dict[str, Any]], saved_at, cutoff) -> bool:
+    """有下载历史时按历史判断（全部结束且最近结束时间早于保留期），否则按文件保存时间判断"""
+    if state:
+        return not state["active"] and state["latest"] is not None and state["latest"] < cutoff
+    return saved_at is not None and saved_at < cutoff
+
+
+def gc_torrent_store(db: Session, retention_days: Optional[int] = None) -> Dict[str, Any]:
+    """清理不再需要的种子文件
+
+    以下情况的种子文件会被删除：
+    - 同一账号对应的下载历史全部处于终态，且最近进入终态的时间早于保留期
+    - 没有任何下载历史，且文件保存时间早于保留期
+    旧版本直接保存在 TORRENT_DIR 下的平铺文件按同样的规则清理（不区分账号），无法解析的文件保留。
+    """
+    if retention_days is None:
+        retention_days = settings.TORRENT_STORE_RETENTION_DAYS
+    cutoff = beijing_now() - timedelta(days=retention_days)
+
+    entries = db.query(TorrentFile).all()
+    # 种子文件按账号分目录存放，下载历史也按（账号，info_hash）对应
+    history_state = _history_state(db, list({e.info_hash for e in entries}))
+
+    removed_files = 0
+    removed_entries = 0
+    freed_bytes = 0
+    removed_paths = set()
+
+    for entry in entries:
+        state = history_state.get((entry.account_id, entry.info_hash))
+        if not _is_expired(state, entry.created_at, cutoff):
+            continue
+
+        path = blob_path(entry.info_hash, entry.account_id)
+        if path not in removed_paths and path.exists():
+            freed_bytes += path.stat().st_size
+            path.unlink()
+            removed_files += 1
+        removed_paths.add(path)
+        db.delete(entry)
+        removed_entries += 1
+
+    db.commit()
+
+    # 旧版本的平铺文件（{torrent_id}.torrent / upload_*.torrent）：早于保留期的才检查下载历史
+    legacy_files = {}
+    for legacy in TORRENT_DIR.glob("*.torrent"):
+        try:
+            mtime = legacy.stat().st_mtime
+            if mtime >= time.time() - retention_days * 86400:
+                continue
+            info_hash = compute_info_hash(legacy.read_bytes())
+        except OSError:
+            continue
+        if info_hash:
+            legacy_files[legacy] = info_hash
+
+    legacy_state = _history_state(db, list(set(legacy_files.values())), per_account=False)
+    for legacy, info_hash in legacy_files.items():
+        state = legacy_state.get(info_hash)
+        # 没有下载历史的文件已经按修改时间判断过
+        if state and not _is_expired(state, None, cutoff):
+            continue
+        try:
+            freed_bytes += legacy.stat().st_size
+            legacy.unlink()
+            removed_files += 1
+        except OSError:
+            continue
+
+    if removed_files or removed_entries:
+        print(f"[TorrentStore] 清理完成: 删除 {removed_files} 个文件，{removed_entries} 条索引，释放 {freed_bytes / 1024 / 1024:.2f} MB")
+
+    return {
+        "removed_files": removed_files,
+        "removed_entries": removed_entries,
+        "freed_bytes": freed_bytes
+    }
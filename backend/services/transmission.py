@@ -0,0 +1,131 @@
+"""
+Transmission RPC 异步客户端
+基于 httpx 直接调用 RPC 接口，与 qBittorrent 客户端共用下载器 HTTP 连接池：
+- 每个操作只请求需要的字段（torrent-get 的 fields），避免拉取 peers、files、trackers 等大字段
+- 按 hash 查询时一次 torrent-get 传入 id 列表
+- X-Transmission-Session-Id 保存在客户端对象中，失效（409）时自动更新并重试
+"""
+
+from typing import Optional, List, Dict, Any
+
+import httpx
+
+from services.qbittorrent import get_downloader_http_client
+from utils.circuit_breaker import CircuitBreaker
+
+# torrent-get 返回的 status 数字 -> 状态名
+TR_STATUS = {
+    0: "stopped",
+    1: "check pending",
+    2: "checking",
+    3: "download pending",
+    4: "downloading",
+    5: "seed pending",
+    6: "seeding",
+}
+
+
+class TransmissionError(Exception):
+    """Transmission 返回错误（认证失败、result 不是 success 等）"""
+
+
+def tr_status(status: Any) -> str:
+    """将 status 数字转换为状态名"""
+    return TR_STATUS.get(status, str(status))
+
+
+class TransmissionClient:
+    """Transmission RPC 客户端"""
+
+    def __init__(
+        self,
+        base_url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.rpc_url = f"{base_url.rstrip('/')}/transmission/rpc"
+        self.auth = httpx.BasicAuth(username, password or "") if username else None
+        self.breaker = breaker
+        self.session_id: Optional[str] = None
+
+    async def _post(self, payload: Dict[str, Any]) -> httpx.Response:
+        """发送 RPC 请求，连接失败、超时和 5xx 计入熔断器"""
+        headers = {}
+        if self.session_id:
+            headers["X-Transmission-Session-Id"] = self.session_id
+
+        try:
+            response = await get_downloader_http_client().post(
+                self.rpc_url, json=payload, headers=headers, auth=self.auth
+            )
+        except httpx.TransportError as e:
+            if self.breaker:
+                self.breaker.record_failure(e.__class__.__name__)
+            raise
+
+        if self.breaker:
+            if response.status_code >= 500:
+                self.breaker.record_failure(f"HTTP {response.status_code}")
+            else:
+                self.breaker.record_success()
+        return response
+
+    async def call(self, method: str, arguments: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """调用 RPC 方法，返回 arguments"""
+        payload = {"method": method, "arguments": arguments or {}}
+        response = await self._post(payload)
+        if response.status_code == 409:
+            # 会话 ID 失效，使用响应中的新 ID 重试
+            self.session_id = response.headers.get("X-Transmission-Session-Id")
+            response = await self._post(payload)
+
+        if response.status_code == 401:
+            raise TransmissionError("认证失败，请检查用户名和密码")
+        if response.status_code != 200:
+            raise TransmissionError(f"{method} 请求失败: HTTP {response.status_code}")
+
+        result = response.json()
+        if result.get("result") != "success":
+            raise TransmissionError(f"{method} 失败: {result.get('result')}")
+        return result.get("arguments") or {}
+
+    async def session_get(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """获取会话设置（版本、下载目录、限速等）"""
+        return await self.call("session-get", {"fields": fields} if fields else None)
+
+    async def session_stats(self) -> Dict[str, Any]:
+        """获取会话统计（当前速度、累计流量）"""
+        return await self.call("session-stats")
+
+    async def free_space(self, path: str) -> Optional[int]:
+        """获取目录所在磁盘的剩余空间（字节）"""
+        arguments = await self.call("free-space", {"path": path})
+        return arguments.get("size-bytes")
+
+    async def torrent_get(self, fields: List[str], ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """获取种子列表
+
+        Args:
+            fields: 需要的字段（Transmission RPC 字段名，如 hashString、percentDone）
+            ids: 只返回指定 hash 的种子，None 表示全部
+        """
+        arguments: Dict[str, Any] = {"fields": fields}
+        if ids is not None:
+            if not ids:
+                return []
+            arguments["ids"] = ids
+        result = await self.call("torrent-get", arguments)
+        return result.get("torrents", [])
+
+    async def torrent_add(self, metainfo: str, download_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """添加种子（metainfo 为 base64 编码的种子文件），返回新增或已存在的种子信息"""
+        arguments = {"metainfo": metainfo}
+        if download_dir:
+            arguments["download-dir"] = download_dir
+        result = await self.call("torrent-add", arguments)
+        return result.get("torrent-added") or result.get("torrent-duplicate")
+
+    async def torrent_remove(self, ids: List[str], delete_local_data: bool = True) -> None:
+        """删除种子"""
+        await self.call("torrent-remove", {"ids": ids, "delete-local-data": delete_local_data})
@@ -0,0 +1,272 @@
+"""
+bencode 扫描工具
+顺序扫描种子文件，只定位需要的字段在原始字节中的位置，不解码整个文件：
+- info_hash 直接对原始 info 字典的字节片段（memoryview，不复制）做 SHA1，不需要解码再重新编码
+- 输入可以是 bytes/bytearray 或覆盖整个缓冲区的 memoryview（均不复制）；memoryview 切片会先复制一份
+- 跳过 pieces 等大字段时只移动位置，不复制数据、不创建 Python 对象
+- 查找分隔符使用 bytes.find（C 实现），避免逐字节循环
+"""
+
+import hashlib
+from typing import Iterator, NamedTuple, Optional, Tuple, Union
+
+_INT = 0x69    # i
+_LIST = 0x6C   # l
+_DICT = 0x64   # d
+_END = 0x65    # e
+_COLON = 0x3A  # :
+
+
+class BencodeError(ValueError):
+    """种子文件格式错误"""
+
+
+class TorrentMeta(NamedTuple):
+    """种子文件的基本信息"""
+    info_hash: str
+    name: Optional[str]
+    comment: Optional[str]  # M-Team 种子的 comment 为种子 ID
+    total_size: int         # 所有文件的总大小（字节）
+    file_count: int
+
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _string_bounds(data: bytes, pos: int) -> Tuple[int, int]:
+    """解析 <长度>:<字节串>，返回内容的范围 [start, end)"""
+    colon = data.find(b":", pos, pos + 21)
+    if colon < 0:
+        raise BencodeError("字节串长度未结束")
+    length = data[pos:colon]
+    if not length.isdigit():
+        raise BencodeError("字节串长度无效")
+    start = colon + 1
+    end = start + int(length)
+    if end > len(data):
+        raise BencodeError("字节串超出数据长度")
+    return start, end
+
+
+def _skip(data: bytes, pos: int) -> int:
+    """跳过从 pos 开始的一个完整元素，返回其结束位置（不含）
+
+    使用深度计数而不是递归，嵌套很深的文件不会导致栈溢出。
+    """
+    size = len(data)
+    depth = 0
+    while True:
+        if pos >= size:
+            raise BencodeError("数据意外结束")
+        c = data[pos]
+        if c == _INT:
+            end = data.find(b"e", pos + 1)
+            if end < 0:
+                raise BencodeError("整数未结束")
+            pos = end + 1
+        elif c == _LIST or c == _DICT:
+            depth += 1
+            pos += 1
+            continue
+        elif c == _END:
+            if depth == 0:
+                raise BencodeError("多余的结束标记")
+            depth -= 1
+            pos += 1
+        elif 0x30 <= c <= 0x39:
+            pos = _string_bounds(data, pos)[1]
+        else:
+            raise BencodeError(f"无效的类型标记: {chr(c)!r}")
+
+        if depth == 0:
+            return pos
+
+
+def _dict_items(data: bytes, pos: int) -> Iterator[Tuple[bytes, int, int]]:
+    """遍历字典，依次返回 (键, 值起始位置, 值结束位置)"""
+    if pos >= len(data) or data[pos] != _DICT:
+        raise BencodeError("不是字典")
+    pos += 1
+    while True:
+        if pos >= len(data):
+            raise BencodeError("字典未结束")
+        if data[pos] == _END:
+            return
+        key_start, key_end = _string_bounds(data, pos)
+        value_end = _skip(data, key_end)
+        yield data[key_start:key_end], key_end, value_end
+        pos = value_end
+
+
+def _read_int(data: bytes, start: int, end: int) -> int:
+    if data[start] != _INT:
+        raise BencodeError("不是整数")
+    try:
+        return int(data[start + 1:end - 1])
+    except ValueError:
+        raise BencodeError("整数无效")
+
+
+def _read_text(data: bytes, start: int) -> str:
+    s, e = _string_bounds(data, start)
+    return data[s:e].decode("utf-8", errors="replace")
+
+
+def _as_bytes(data: Buffer) -> Union[bytes, bytearray]:
+    """转为可以 find 的对象
+
+    bytes/bytearray 原样返回；覆盖整个 bytes/bytearray 的 memoryview 直接扫描底层对象，不复制；
+    只覆盖一部分的 memoryview（切片）会复制一份。
+    """
+    if isinstance(data, memoryview):
+        obj = data.obj
+        if (isinstance(obj, (bytes, bytearray)) and data.c_contiguous
+                and data.itemsize == 1 and data.nbytes == len(obj)):
+            return obj
+        return data.tobytes()
+    return data
+
+
+def find_info_span(data: Buffer) -> Tuple[int, int]:
+    """定位顶层字典中 info 字段值的字节范围 [start, end)"""
+    data = _as_bytes(data)
+    if not data or data[0] != _DICT:
+        raise BencodeError("种子文件顶层不是字典")
+
+    for key, start, end in _dict_items(data, 0):
+        if key == b"info":
+            return start, end
+
+    raise BencodeError("种子文件缺少 info 字段")
+
+
+def compute_info_hash(data: Buffer) -> Optional[str]:
+    """计算种子的 info_hash（原始 info 字典字节的 SHA1），解析失败返回 None"""
+    data = _as_bytes(data)
+    try:
+        start, end = find_info_span(data)
+    except BencodeError:
+        return None
+    return hashlib.sha1(memoryview(data)[start:end]).hexdigest()
+
+
+def _int_end(data: bytes, pos: int) -> int:
+    """整数元素 i<数字>e 的结束位置（不含）"""
+    if pos >= len(data) or data[pos] != _INT:
+        raise BencodeError("不是整数")
+    end = data.find(b"e", pos + 1)
+    if end < 0:
+        raise BencodeError("整数未结束")
+    return end + 1
+
+
+def _scan_files(data: bytes, pos: int) -> Tuple[int, int, int]:
+    """扫描多文件种子的 files 列表，只读取每个文件的 length
+
+    Returns:
+        (列表结束位置, 总大小, 文件数)
+    """
+    if pos >= len(data) or data[pos] != _LIST:
+        raise BencodeError("files 不是列表")
+    pos += 1
+    total_size = 0
+    file_count = 0
+    while True:
+        if pos >= len(data):
+            raise BencodeError("files 列表未结束")
+        if data[pos] == _END:
+            return pos + 1, total_size, file_count
+        if data[pos] != _DICT:
+            raise BencodeError("files 元素不是字典")
+        pos += 1
+        while True:
+            if pos >= len(data):
+                raise BencodeError("文件字典未结束")
+            if data[pos] == _END:
+                pos += 1
+                break
+            key_start, key_end = _string_bounds(data, pos)
+            if data[key_start:key_end] == b"length":
+                pos = _int_end(data, key_end)
+                total_size += _read_int(data, key_end, pos)
+            else:
+                pos = _skip(data, key_end)
+        file_count += 1
+
+
+def _scan_info(data: bytes, pos: int) -> Tuple[int, Optional[str], int, int]:
+    """扫描 info 字典，只解析名称和文件大小，其余字段（pieces 等）直接跳过
+
+    Returns:
+        (字典结束位置, 名称, 总大小, 文件数)
+    """
+    if pos >= len(data) or data[pos] != _DICT:
+        raise BencodeError("info 不是字典")
+    pos += 1
+    name = None
+    utf8_name = None
+    total_size = 0
+    file_count = 0
+    while True:
+        if pos >= len(data):
+            raise BencodeError("info 字典未结束")
+        if data[pos] == _END:
+            return pos + 1, utf8_name or name, total_size, file_count
+        key_start, key_end = _string_bounds(data, pos)
+        key = data[key_start:key_end]
+        if key == b"files":
+            # 多文件种子
+            pos, total_size, file_count = _scan_files(data, key_end)
+            continue
+        pos = _skip(data, key_end)
+        if key == b"name":
+            name = _read_text(data, key_end)
+        elif key == b"name.utf-8":
+            utf8_name = _read_text(data, key_end)
+        elif key == b"length":
+            # 单文件种子
+            total_size = _read_int(data, key_end, pos)
+            file_count = 1
+
+
+def scan_torrent(data: Buffer) -> TorrentMeta:
+    """扫描种子文件，提取 info_hash、名称、comment 和总大小
+
+    整个文件只扫描一遍，info 字典在扫描过程中确定字节范围。
+
+    Raises:
+        BencodeError: 文件格式错误或缺少 info 字段
+    """
+    data = _as_bytes(data)
+    if not data or data[0] != _DICT:
+        raise BencodeError("种子文件顶层不是字典")
+
+    comment = None
+    info = None
+    pos = 1
+    while True:
+        if pos >= len(data):
+            raise BencodeError("字典未结束")
+        if data[pos] == _END:
+            break
+        key_start, key_end = _string_bounds(data, pos)
+        key = data[key_start:key_end]
+        if key == b"info":
+            pos, name, total_size, file_count = _scan_info(data, key_end)
+            info = (key_end, pos, name, total_size, file_count)
+            continue
+        pos = _skip(data, key_end)
+        if key == b"comment":
+            comment = _read_text(data, key_end)
+
+    if info is None:
+        raise BencodeError("种子文件缺少 info 字段")
+
+    info_start, info_end, name, total_size, file_count = info
+    return TorrentMeta(
+        info_hash=hashlib.sha1(memoryview(data)[info_start:info_end]).hexdigest(),
+        name=name,
+        comment=comment,
+        total_size=total_size,
+        file_count=file_count
+    )
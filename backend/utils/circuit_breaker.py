@@ -0,0 +1,198 @@
+"""
+熔断器
+按后端（M-Team 账号、下载器）记录连续失败次数，后端不可用时快速失败，
+避免每个定时任务和页面请求都等待完整的超时时间：
+
+- closed: 正常放行请求，连续失败达到阈值后熔断
+- open: 直接拒绝请求，后台定期探测后端是否恢复
+- half_open: 探测成功或熔断时间已过，放行一个试探请求，成功则恢复，失败则重新熔断
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """后端处于熔断状态，请求被直接拒绝"""
+
+    def __init__(self, name: str, retry_in: float):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} 暂时不可用（熔断中），约 {retry_in:.0f} 秒后重试")
+
+
+class CircuitBreaker:
+    """单个后端的熔断器
+
+    - failure_threshold: 连续失败多少次后熔断
+    - recovery_timeout: 熔断后多久允许试探请求，同时也是后台探测的间隔（秒）
+    - probe: 后台探测函数，返回 True 表示后端已恢复
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        probe: Optional[Callable[[], Awaitable[bool]]] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self.last_error: Optional[str] = None
+        self.rejected_count = 0
+        self.open_count = 0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def allow_request(self) -> bool:
+        """判断是否放行请求，half_open 状态同一时间只放行一个试探请求"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = HALF_OPEN
+            self._trial_in_flight = False
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN:
+            now = time.monotonic()
+            # 试探请求被取消等情况下没有回报结果，超时后允许新的试探
+            if not self._trial_in_flight or now - self._trial_started_at >= self.recovery_timeout:
+                self._trial_in_flight = True
+                self._trial_started_at = now
+                return True
+
+        self.rejected_count += 1
+        return False
+
+    def check(self) -> None:
+        """不允许请求时抛出 CircuitOpenError"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_in)
+
+    @property
+    def retry_in(self) -> float:
+        """距离允许试探请求的剩余秒数"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        """请求成功，恢复正常状态"""
+        if self.state != CLOSED:
+            print(f"[CircuitBreaker] {self.name} 已恢复")
+        self.state = CLOSED
+        self.failure_count = 0
+        self.last_error = None
+        self._trial_in_flight = False
+
+    def record_failure(self, error: Any = None) -> None:
+        """请求失败（连接失败、超时、服务端错误），达到阈值或试探失败时熔断"""
+        self.failure_count += 1
+        if error is not None:
+            self.last_error = str(error)[:200]
+        self._trial_in_flight = False
+
+        if self.state == HALF_OPEN or self.failure_count >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        """进入熔断状态，并启动后台探测"""
+        if self.state != OPEN:
+            self.open_count += 1
+            print(f"[CircuitBreaker] {self.name} 连续失败 {self.failure_count} 次，熔断 {self.recovery_timeout:.0f} 秒: {self.last_error}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._start_probe()
+
+    def _start_probe(self) -> None:
+        """在后台定期探测后端，恢复后转为 half_open 等待试探请求"""
+        if self.probe is None or (self._probe_task is not None and not self._probe_task.done()):
+            return
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+        except RuntimeError:
+            # 没有运行中的事件循环（例如在线程中调用），只依赖熔断超时后的试探请求
+            self._probe_task = None
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            await asyncio.sleep(self.recovery_timeout)
+            if self.state != OPEN:
+                break
+            try:
+                alive = await self.probe()
+            except Exception:
+                alive = False
+            if alive and self.state == OPEN:
+                print(f"[CircuitBreaker] {self.name} 探测成功，允许试探请求")
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            elif self.state == OPEN:
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        return {
+            "state": self.state,
+            "failure_count": self.failure_count,
+            "retry_in": round(self.retry_in, 1),
+            "open_count": self.open_count,
+            "rejected_count": self.rejected_count,
+            "last_error": self.last_error
+        }
+
+
+async def probe_url(url: str, timeout: float = 5.0) -> bool:
+    """探测 URL 是否可达：收到任何非 5xx 响应即视为后端已恢复"""
+    async with httpx.AsyncClient(timeout=timeout, verify=False) as client:
+        response = await client.get(url)
+        return response.status_code < 500
+
+
+# 按后端区分的熔断器，key 为 "mteam:<api_key>" 或 "downloader:<id>"
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(
+    key: str,
+    name: Optional[str] = None,
+    probe: Optional[Callable[[], Awaitable[bool]]] = None
+) -> CircuitBreaker:
+    """获取（或创建）指定后端的熔断器"""
+    breaker = _breakers.get(key)
+    if breaker is None:
+        from config import settings
+        breaker = CircuitBreaker(
+            name or key,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=settings.CIRCUIT_BREAKER_RECOVERY_TIMEOUT,
+            probe=probe
+        )
+        _breakers[key] = breaker
+    elif probe is not None:
+        breaker.probe = probe
+    return breaker
+
+
+def remove_circuit_breaker(key: str) -> None:
+    """移除熔断器（后端被删除或配置变更时调用）"""
+    breaker = _breakers.pop(key, None)
+    if breaker and breaker._probe_task is not None:
+        breaker._probe_task.cancel()
+
+
+def get_circuit_breaker_stats() -> Dict[str, Any]:
+    """获取所有熔断器状态（M-Team 熔断器以 API Key 的不可逆标识命名）"""
+    return {breaker.name: breaker.stats() for breaker in _breakers.values()}
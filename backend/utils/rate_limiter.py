@@ -0,0 +1,144 @@
+"""
+令牌桶限流器
+按 API Key 限制对 M-Team 的请求速率，遇到限流/服务端错误时自动降速，
+调用方会排队等待而不是直接失败
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import Dict, Any, Optional
+
+# 触发降速的错误信息关键字（M-Team 返回的 message）
+THROTTLE_HINTS = ("频繁", "頻繁", "too many", "rate limit", "限流", "稍后再试", "稍後再試")
+
+
+class TokenBucket:
+    """带自适应退避的令牌桶
+
+    - rate: 持续速率（每秒令牌数）
+    - burst: 桶容量（允许的突发请求数）
+    - penalty: 降速系数，>=1，实际速率 = rate / penalty
+    """
+
+    def __init__(self, rate: float, burst: int, max_backoff: float = 60.0):
+        self.rate = rate
+        self.burst = burst
+        self.max_backoff = max_backoff
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.penalty = 1.0
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.total_requests = 0
+        self.throttled_count = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def effective_rate(self) -> float:
+        """当前实际速率（考虑降速系数）"""
+        return self.rate / self.penalty
+
+    def _refill(self, now: float) -> None:
+        """按流逝时间补充令牌"""
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.effective_rate)
+
+    async def acquire(self) -> None:
+        """获取一个令牌，令牌不足时排队等待（先到先得）"""
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+
+                    # 退避期内整体暂停
+                    if now < self.blocked_until:
+                        await asyncio.sleep(self.blocked_until - now)
+                        continue
+
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.total_requests += 1
+                        return
+
+                    await asyncio.sleep((1 - self.tokens) / self.effective_rate)
+        finally:
+            self.waiting -= 1
+
+    def on_success(self) -> None:
+        """请求成功，逐步恢复速率"""
+        if self.penalty > 1.0:
+            self.penalty = max(1.0, self.penalty * 0.9)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """遇到限流（429）或服务端错误（5xx），降速并暂停一段时间"""
+        self.throttled_count += 1
+        self.penalty = min(self.penalty * 2, 32.0)
+        backoff = retry_after if retry_after is not None else min(self.max_backoff, self.penalty)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + backoff)
+        self.tokens = 0.0
+        print(f"[RateLimiter] 检测到限流，暂停 {backoff:.1f} 秒，速率降为 {self.effective_rate:.2f}/秒")
+
+    def on_api_error(self, message: Optional[str]) -> None:
+        """API 返回错误 code，只有限流类错误才降速（种子不存在、参数错误等业务错误不影响速率）"""
+        text = (message or "").lower()
+        if any(hint in text for hint in THROTTLE_HINTS):
+            self.on_throttle()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取限流器状态"""
+        now = time.monotonic()
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "effective_rate": round(self.effective_rate, 3),
+            "penalty": round(self.penalty, 2),
+            "waiting": self.waiting,
+            "blocked_seconds": round(max(0.0, self.blocked_until - now), 1),
+            "total_requests": self.total_requests,
+            "throttled_count": self.throttled_count
+        }
+
+
+# 按 API Key 区分的限流器
+_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(api_key: str) -> TokenBucket:
+    """获取（或创建）指定 API Key 的限流器"""
+    limiter = _limiters.get(api_key)
+    if limiter is None:
+        from config import settings
+        limiter = TokenBucket(
+            rate=settings.MTEAM_RATE_LIMIT_PER_SECOND,
+            burst=settings.MTEAM_RATE_LIMIT_BURST,
+            max_backoff=settings.MTEAM_RATE_LIMIT_MAX_BACKOFF
+        )
+        _limiters[api_key] = limiter
+    return limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（仅支持秒数格式）"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    """API Key 的不可逆标识（用于统计和日志，不同 Key 前缀相同时也不会冲突）"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+def get_rate_limiter_stats() -> Dict[str, Any]:
+    """获取所有限流器状态（按 API Key 的不可逆标识区分）"""
+    return {
+        api_key_fingerprint(key): limiter.stats()
+        for key, limiter in _limiters.items()
+    }
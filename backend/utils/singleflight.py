@@ -0,0 +1,48 @@
+"""
+单飞（single-flight）请求合并
+同一时刻相同 key 的并发调用只执行一次，其余调用等待并共享同一个结果
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """进行中请求登记表"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed_count = 0  # 实际执行次数
+        self.shared_count = 0    # 复用进行中请求的次数
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行 func，如果相同 key 的调用正在进行中则直接等待其结果
+
+        实际请求运行在独立任务中，某个调用方被取消不会影响其他等待者。
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self.executed_count += 1
+            task.add_done_callback(lambda t, k=key: self._on_done(k, t))
+        else:
+            self.shared_count += 1
+
+        return await asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task) -> None:
+        """请求完成后移出登记表"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 所有等待者都被取消时，避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """获取合并统计"""
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed_count,
+            "shared": self.shared_count
+        }